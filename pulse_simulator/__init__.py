@@ -1,6 +1,25 @@
-from .one_qubit_models import qubit_decay_model, rx_model, get_drive_channel
+from .one_qubit_models import (
+    qubit_decay_model,
+    rx_model,
+    rx_local_model,
+    get_drive_channel,
+)
+from .transmon_models import (
+    level_operator,
+    levels_from_label,
+    levels_diagonal,
+    transmon_rx_model,
+    transmon_local_model,
+    transmon_crosstalk_diagonal,
+    transmon_cross_resonance_model,
+    computational_indices,
+    leakage_populations,
+)
 from .two_qubit_models import (
     zz_coupling,
+    zz_couplings,
+    zz_coupling_strengths,
+    zz_diagonal,
     crosstalk_model,
     cross_resonance_model,
     get_control_channel,
@@ -13,9 +32,44 @@ from .hilbert_space_labels import (
 )
 from .qiskit_simulation_utils import (
     rz_moment,
+    rz_diagonal,
+    qubit_reversal_permutation,
     qiskit_ground_state,
     qiskit_identity_operator,
 )
+from .pulse_library import (
+    load_pulse_array,
+    save_pulse_array,
+    normalize_pulses,
+    load_pulse_library,
+    load_pulse_directory,
+)
+from .local_channels import (
+    dissipator_superoperator,
+    dissipator_channel,
+    apply_local_superoperator,
+    apply_local_operator,
+    apply_two_qubit_operator,
+    kraus_operators,
+    sample_local_kraus,
+    local_operators,
+    local_expectation,
+)
+from .jax_propagation import (
+    piecewise_constant_propagator,
+    static_propagator,
+    unitary_fidelity,
+)
+from .split_propagation import (
+    joint_eigenbasis,
+    diagonal_drift_propagate,
+    split_operator_propagate,
+    pauli_z_decomposition,
+    pulse_propagator_table,
+    table_moment_propagate,
+)
+from .mps_propagation import MatrixProductState
+from .robustness import perturbation_points, perturb_variables, robustness_sweep
 from .qiskit_operator_labels import *
 from .qiskit_backend_utils import *
 from .plot_utils import *
@@ -0,0 +1,70 @@
+import time
+import pulse_simulator as ps
+import qiskit_dynamics as qk_d
+import qiskit.providers.fake_provider as qk_fp
+import qiskit
+
+# The diagonal drift preset against the dense jax_expm solve, for a moment of
+# pulses on every qubit of growing registers of a 16 qubit backend.
+# Run from the repository root: python -m pulse_simulator.benchmark_diagonal_drift
+
+backend = qk_fp.FakeGuadalupe()
+units = 1e9
+dt = backend.configuration().dt * units
+config_vars = ps.backend_simulation_vars(backend, rabi=False, units=units)
+
+file_name = "./pico-pulses/saved-pulses-2023-12-13/a_single_qubit_gateset_R1e-6.csv"
+pulses = ps.load_pulse_library(file_name, dt)
+
+
+def make_solver(registers):
+    Hs_control = []
+    Hs_channels = []
+    for qubit in registers:
+        Hj_drift, Hjs_control, Hjs_channel = ps.rx_model(
+            qubit, registers, backend, config_vars, rotating_frame=False
+        )
+        Hs_control += Hjs_control
+        Hs_channels += Hjs_channel
+    H_xtalk = ps.crosstalk_model(registers, ps.backend_edges(backend), config_vars)
+    return qk_d.Solver(
+        static_hamiltonian=H_xtalk,
+        hamiltonian_operators=Hs_control,
+        static_dissipators=None,
+        rotating_frame=None,
+        rwa_cutoff_freq=None,
+        hamiltonian_channels=Hs_channels,
+        channel_carrier_freqs={ch: 0.0 for ch in Hs_channels},
+        dt=dt,
+    )
+
+
+print(f"{'qubits':>6} {'exact [s]':>10} {'diagonal [s]':>13} {'infidelity':>12}")
+for N in [4, 5, 6, 7, 8]:
+    registers = [i for i in range(N)]
+    solver = make_solver(registers)
+    qc = qiskit.QuantumCircuit(N)
+    for i in range(N):
+        qc.sx(i)
+
+    outs = {}
+    times = {}
+    for preset in ["exact", "diagonal"]:
+        sim = ps.simulator.Simulator(
+            basis_gates=["rz", "sx", "x", "cx"],
+            solver=solver,
+            backend=backend,
+            integration=preset,
+        )
+        sim.set_pulses(pulses)
+        sim.get_compiled_circuit(qc)
+        start = time.perf_counter()
+        outs[preset] = sim.simulate_circuit(qc)
+        times[preset] = time.perf_counter() - start
+
+    infidelity = 1 - qiskit.quantum_info.process_fidelity(
+        outs["diagonal"], outs["exact"]
+    )
+    print(
+        f"{N:>6} {times['exact']:>10.2f} {times['diagonal']:>13.3f} {infidelity:>12.2e}"
+    )
@@ -0,0 +1,93 @@
+import time
+import pulse_simulator as ps
+import qiskit_dynamics as qk_d
+import qiskit.providers.fake_provider as qk_fp
+import numpy as np
+import qiskit
+
+# Accuracy against speed of the integration presets on the bundled pulses.
+# Run from the repository root: python -m pulse_simulator.benchmark_integration
+
+backend = qk_fp.FakeManila()
+units = 1e9
+dt = backend.configuration().dt * units
+
+N = 5  # number of spins
+hz = 1.0 * 2 * np.pi  # magnetic field along z
+Jx = 1.0 * 2 * np.pi  # Coupling along x
+Δt = 0.05  # time step for integration
+
+registers = [i for i in range(N)]
+config_vars = ps.backend_simulation_vars(backend, rabi=False, units=units)
+
+Hs_control = []
+Hs_channels = []
+for qubit in registers:
+    Hj_drift, Hjs_control, Hjs_channel = ps.rx_model(
+        qubit, registers, backend, config_vars, rotating_frame=False
+    )
+    Hs_control += Hjs_control
+    Hs_channels += Hjs_channel
+
+H_xtalk = ps.crosstalk_model(registers, ps.backend_edges(backend), config_vars)
+
+solver = qk_d.Solver(
+    static_hamiltonian=H_xtalk,
+    hamiltonian_operators=Hs_control,
+    static_dissipators=None,
+    rotating_frame=None,
+    rwa_cutoff_freq=None,
+    hamiltonian_channels=Hs_channels,
+    channel_carrier_freqs={ch: 0.0 for ch in Hs_channels},
+    dt=dt,
+)
+
+file_name = "./pico-pulses/saved-pulses-2023-12-13/a_single_qubit_gateset_R1e-6.csv"
+pulses = ps.load_pulse_library(file_name, dt)
+
+
+def trotter_circuit(steps):
+    qc = qiskit.QuantumCircuit(N)
+    for i in range(N):
+        qc.h(i)
+    qc.barrier()
+    for _ in range(steps):
+        for start in [0, 1]:
+            for p in range(start, N - 1, 2):
+                qc.cx(p, p + 1)
+                qc.rx(Jx * Δt, p)
+                qc.cx(p, p + 1)
+        for p in range(N):
+            qc.rz(hz * Δt, p)
+    return qc
+
+
+def make_simulator(integration):
+    sim = ps.simulator.Simulator(
+        basis_gates=["rz", "sx", "x", "cx"],
+        solver=solver,
+        backend=backend,
+        integration=integration,
+    )
+    sim.set_pulses(pulses)
+    return sim
+
+
+qc = trotter_circuit(1)
+expected = qiskit.quantum_info.Operator(qc)
+
+# compile once so that the first timed preset does not pay for it
+make_simulator("exact").get_compiled_circuit(qc)
+
+reference = None
+print(f"{'preset':>10} {'time [s]':>10} {'infidelity':>12} {'fidelity':>10}")
+for preset in ps.simulator.INTEGRATION_PRESETS:
+    sim = make_simulator(preset)
+    start = time.perf_counter()
+    out = sim.simulate_circuit(qc)
+    elapsed = time.perf_counter() - start
+    if reference is None:
+        reference = out
+    infidelity = 1 - qiskit.quantum_info.process_fidelity(out, reference)
+    fidelity = qiskit.quantum_info.process_fidelity(out, expected)
+    print(f"{preset:>10} {elapsed:>10.2f} {infidelity:>12.2e} {fidelity:>10.6f}")
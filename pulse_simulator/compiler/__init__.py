@@ -1,2 +1,5 @@
 from .scheduler import RobustScheduler
 from .pulse_builder import PulseBuilder
+from .circuit_key import circuit_key, parameter_key
+from .coloring import pulse_coloring
+from .passes import parameter_namespace
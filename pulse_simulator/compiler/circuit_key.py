@@ -0,0 +1,73 @@
+from numbers import Number
+
+import numpy as np
+from qiskit import ClassicalRegister, QuantumCircuit
+from qiskit.circuit import ControlledGate, Gate, Instruction
+
+
+def circuit_key(circuit: QuantumCircuit) -> tuple:
+    """Hashable key of the structure of a circuit.
+
+    Two circuits have the same key if they apply the same operations with the
+    same parameters to the same qubit and clbit indices, with the same global
+    phase and conditions. Names of registers, labels and metadata are
+    ignored. Unbound parameters enter by identity, so a fresh parameter of
+    the same name gives a different key. Custom gates, e.g. from `to_gate`,
+    enter by their definition, since their name does not fix their body.
+    """
+    instructions = []
+    for instruction in circuit.data:
+        qubits = tuple(circuit.find_bit(q).index for q in instruction.qubits)
+        clbits = tuple(circuit.find_bit(c).index for c in instruction.clbits)
+        key = _operation_key(instruction.operation, circuit)
+        instructions.append((key, qubits, clbits))
+    global_phase = circuit.global_phase
+    if not isinstance(global_phase, Number):
+        global_phase = parameter_key(global_phase)
+    return (
+        circuit.num_qubits,
+        circuit.num_clbits,
+        global_phase,
+        tuple(instructions),
+    )
+
+
+def parameter_key(param) -> tuple:
+    """Hashable key of a parameter or expression, by its expression and the
+    identity of its parameters."""
+    parameters = getattr(param, "parameters", ())
+    return (str(param), tuple(sorted(p._uuid for p in parameters)))
+
+
+def _operation_key(operation, circuit: QuantumCircuit) -> tuple:
+    params = tuple(_param_key(param) for param in operation.params)
+    base_class = getattr(operation, "base_class", type(operation))
+    key = (base_class.__name__, operation.name, params)
+    condition = getattr(operation, "condition", None)
+    if condition is not None:
+        target, value = condition
+        if isinstance(target, ClassicalRegister):
+            bits = tuple(circuit.find_bit(c).index for c in target)
+        else:
+            bits = (circuit.find_bit(target).index,)
+        key += (("condition", bits, value),)
+    if isinstance(operation, ControlledGate):
+        base_key = _operation_key(operation.base_gate, circuit)
+        key += (operation.num_ctrl_qubits, operation.ctrl_state, base_key)
+    elif base_class in (Gate, Instruction):
+        # the body of a custom gate is only known from its definition
+        definition = operation.definition
+        key += (None if definition is None else circuit_key(definition),)
+    return key
+
+
+def _param_key(param):
+    if isinstance(param, Number):
+        return param
+    if isinstance(param, np.ndarray):
+        return (param.dtype.str, param.shape, param.tobytes())
+    if isinstance(param, QuantumCircuit):
+        return circuit_key(param)
+    if hasattr(param, "parameters"):
+        return parameter_key(param)
+    return (type(param).__name__, str(param))
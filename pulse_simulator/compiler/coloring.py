@@ -0,0 +1,124 @@
+import functools
+
+from qiskit.transpiler import CouplingMap
+
+PULSE_COLORS = ["red", "blue", "green", "yellow", "purple", "orange"]
+
+# custom types
+EDGE = tuple[int, int]
+ONE_Q_COLORING = dict[int, str]
+TWO_Q_COLORING = dict[EDGE, str]
+
+
+def pulse_coloring(
+    num_qubits: int,
+    coupling_map: CouplingMap | list[EDGE] | None = None,
+    crosstalk_graph: list[EDGE] | None = None,
+) -> tuple[ONE_Q_COLORING, TWO_Q_COLORING]:
+    """Assign pulse colors so that simultaneous pulses with crosstalk differ.
+
+    One-qubit pulses need different colors on qubits joined by a crosstalk
+    edge. Two-qubit pulses can only run together on disjoint edges, which need
+    different colors if a crosstalk edge joins them. Each conflict graph is
+    colored with two colors when it is bipartite (chains, grids, heavy-hex)
+    and with the DSatur heuristic otherwise. Results are cached per graph.
+
+    Arguments:
+        num_qubits: Number of qubits in the circuit.
+        coupling_map: Allowed two-qubit edges. Defaults to the linear chain
+            used by `RobustScheduler`.
+        crosstalk_graph: Edges with crosstalk. Defaults to the coupling map.
+
+    Returns:
+        The colors of the one-qubit pulses by qubit and of the two-qubit
+        pulses by (sorted) edge.
+    """
+    if coupling_map is None:
+        edges = [(i, i + 1) for i in range(num_qubits - 1)]
+    elif isinstance(coupling_map, CouplingMap):
+        edges = coupling_map.get_edges()
+    else:
+        edges = coupling_map
+    edges = _undirected(edges)
+    crosstalk = edges if crosstalk_graph is None else _undirected(crosstalk_graph)
+
+    one_q_coloring, two_q_coloring = _pulse_coloring(num_qubits, edges, crosstalk)
+    return dict(one_q_coloring), dict(two_q_coloring)
+
+
+def _undirected(edges: list[EDGE]) -> tuple[EDGE, ...]:
+    return tuple(sorted({tuple(sorted(edge)) for edge in edges if edge[0] != edge[1]}))
+
+
+@functools.lru_cache(maxsize=32)
+def _pulse_coloring(
+    num_qubits: int, edges: tuple[EDGE, ...], crosstalk: tuple[EDGE, ...]
+) -> tuple[ONE_Q_COLORING, TWO_Q_COLORING]:
+    qubits = list(range(num_qubits))
+    neighbors = {qubit: set() for qubit in qubits}
+    for i, j in crosstalk:
+        if i < num_qubits and j < num_qubits:
+            neighbors[i].add(j)
+            neighbors[j].add(i)
+    one_q_coloring = _color_graph(qubits, neighbors)
+
+    # disjoint edges conflict when crosstalk couples one of their qubits
+    edges = [edge for edge in edges if max(edge) < num_qubits]
+    edge_neighbors = {edge: set() for edge in edges}
+    for e in edges:
+        for f in edges:
+            if e < f and not set(e) & set(f):
+                if any(j in neighbors[i] for i in e for j in f):
+                    edge_neighbors[e].add(f)
+                    edge_neighbors[f].add(e)
+    two_q_coloring = _color_graph(edges, edge_neighbors)
+
+    return one_q_coloring, two_q_coloring
+
+
+def _color_graph(nodes: list, neighbors: dict) -> dict:
+    colors = {}
+    for start in nodes:
+        if start in colors:
+            continue
+
+        # two-color the component by breadth-first search from its first node
+        component = [start]
+        colors[start] = 0
+        bipartite = True
+        for node in component:
+            for other in sorted(neighbors[node]):
+                if other not in colors:
+                    colors[other] = 1 - colors[node]
+                    component.append(other)
+                elif colors[other] == colors[node]:
+                    bipartite = False
+
+        if not bipartite:
+            for node in component:
+                del colors[node]
+            colors.update(_dsatur(sorted(component), neighbors))
+
+    return {node: _color_name(color) for node, color in colors.items()}
+
+
+def _color_name(color: int) -> str:
+    if color < len(PULSE_COLORS):
+        return PULSE_COLORS[color]
+    return f"color{color}"
+
+
+def _dsatur(nodes: list, neighbors: dict) -> dict:
+    colors = {}
+    while len(colors) < len(nodes):
+        # color the node with the most differently colored neighbors first
+        node = max(
+            (node for node in nodes if node not in colors),
+            key=lambda node: (
+                len({colors[n] for n in neighbors[node] if n in colors}),
+                len(neighbors[node]),
+            ),
+        )
+        used = {colors[n] for n in neighbors[node] if n in colors}
+        colors[node] = min(c for c in range(len(nodes) + 1) if c not in used)
+    return colors
@@ -3,5 +3,6 @@ from .delete_barriers import DeleteConsecutiveBarriers
 from .slide_one_q_ops import SlideOneQubitOps
 from .slide_two_q_ops import SlideTwoQubitOps
 from .attach_virtual import AttachVirtualGates
-from .expand_virtual import ExpandVirtualGates
+from .expand_virtual import ExpandVirtualGates, parameter_namespace
 from .merge_rz import MergeAdjacentRzs
+from .pack_moments import PackMoments
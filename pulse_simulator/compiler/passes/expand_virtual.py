@@ -4,19 +4,43 @@ from qiskit.transpiler.basepasses import TransformationPass
 from qiskit.circuit import Operation, Gate
 from qiskit.circuit import Qubit
 from qiskit.circuit.library import RZGate
+from qiskit.circuit.parametervector import ParameterVectorElement
+
+
+def parameter_namespace(circuit) -> dict:
+    """Names needed to evaluate the parameters of virtual gate labels, e.g.
+    "[ParameterExpression(θ[0] + 3.14159265358979)]", mapped to the
+    parameters of `circuit`."""
+    namespace = {
+        "Parameter": lambda parameter: parameter,
+        "ParameterVectorElement": lambda parameter: parameter,
+        "ParameterExpression": lambda expression: expression,
+    }
+    for parameter in circuit.parameters:
+        if isinstance(parameter, ParameterVectorElement):
+            namespace[parameter.vector.name] = parameter.vector
+        else:
+            namespace[parameter.name] = parameter
+    return namespace
 
 
 class ExpandVirtualGates(TransformationPass):
-    def __init__(self, virtual_dict: dict[str, Gate] = {"rz": RZGate}):
-        """Deattaches virtual gates from real moments."""
+    def __init__(
+        self,
+        virtual_dict: dict[str, Gate] = {"rz": RZGate},
+        namespace: dict | None = None,
+    ):
+        """Deattaches virtual gates from real moments. Parameters in the
+        labels are resolved with `namespace`, see `parameter_namespace`."""
         super().__init__()
         self._virtual_dict = virtual_dict
+        self._namespace = namespace
 
     def _parse_name_to_instruction(self, virtual: str) -> Operation:
         virtual_dict = self._virtual_dict
         processed = virtual.split("|")
         gate = virtual_dict[processed[0]]
-        params = eval(processed[1])
+        params = eval(processed[1], globals(), self._namespace)
         qargs = eval(processed[2])
         if isinstance(qargs, Qubit):
             qargs = (qargs,)
@@ -0,0 +1,116 @@
+from qiskit.dagcircuit import DAGCircuit
+from qiskit.circuit.library import Barrier
+from qiskit.transpiler.basepasses import TransformationPass
+
+
+class PackMoments(TransformationPass):
+    def __init__(self):
+        """Packs operations into as few one- and two-qubit moments as possible."""
+        super().__init__()
+        self._report = dict()
+
+    def _count_moments(self, dag: DAGCircuit) -> int:
+        count = 0
+        for layer in dag.layers():
+            gates = layer["graph"].op_nodes(include_directives=True)
+            if any(gate.op.name != "barrier" for gate in gates):
+                count += 1
+        return count
+
+    def _list_schedule(self, dag: DAGCircuit) -> list[tuple[str, list]]:
+        # operations with their neighbours on each wire, barriers aside
+        gates = [g for g in dag.topological_op_nodes() if g.op.name != "barrier"]
+        predecessors = {gate: [] for gate in gates}
+        successors = {gate: [] for gate in gates}
+        last_gate = {}
+        for gate in gates:
+            for wire in list(gate.qargs) + list(gate.cargs):
+                if wire in last_gate:
+                    predecessors[gate].append(last_gate[wire])
+                    successors[last_gate[wire]].append(gate)
+                last_gate[wire] = gate
+        kinds = {gate: "two" if len(gate.qargs) == 2 else "one" for gate in gates}
+
+        # place each operation in the first moment of its type after all the
+        # moments of its predecessors, opening a new moment if needed
+        types: list[str] = []
+        index = {}
+        for gate in gates:
+            k = max([index[p] for p in predecessors[gate]] + [-1]) + 1
+            while k < len(types) and types[k] != kinds[gate]:
+                k += 1
+            if k == len(types):
+                types.append(kinds[gate])
+            index[gate] = k
+
+        # as soon as possible placement misses moments that only empty out if
+        # operations move later, e.g. sx(0) before a cx(1, 2) joins a later
+        # sx(1). Alternately move every operation to the latest and to the
+        # earliest moment of its type that its neighbours allow, and drop the
+        # moments left empty, until the number of moments stops decreasing.
+        while True:
+            num_moments = len(types)
+            for gate in reversed(gates):
+                last = min([index[s] for s in successors[gate]] + [len(types)]) - 1
+                index[gate] = max(
+                    k for k in range(index[gate], last + 1) if types[k] == kinds[gate]
+                )
+            types, index = self._drop_empty(types, index)
+            for gate in gates:
+                first = max([index[p] for p in predecessors[gate]] + [-1]) + 1
+                index[gate] = min(
+                    k for k in range(first, index[gate] + 1) if types[k] == kinds[gate]
+                )
+            types, index = self._drop_empty(types, index)
+            if len(types) >= num_moments:
+                break
+
+        moments = [(moment_type, []) for moment_type in types]
+        for gate in gates:
+            moments[index[gate]][1].append(gate)
+        return moments
+
+    def _drop_empty(self, types: list[str], index: dict) -> tuple[list[str], dict]:
+        used = sorted(set(index.values()))
+        renumber = {k: i for i, k in enumerate(used)}
+        return [types[k] for k in used], {g: renumber[k] for g, k in index.items()}
+
+    def run(self, dag: DAGCircuit) -> DAGCircuit:
+        new_dag = DAGCircuit()
+        for qreg in dag.qregs.values():
+            new_dag.add_qreg(qreg)
+        for creg in dag.cregs.values():
+            new_dag.add_creg(creg)
+
+        qr = dag.qregs[list(dag.qregs.keys())[0]]
+
+        moments = self._list_schedule(dag)
+
+        # two-qubit moments are fenced by barriers so that the layers of the
+        # new dag are the moments found above
+        fenced = False
+        for moment_type, gates in moments:
+            if moment_type == "two" and not fenced:
+                new_dag.apply_operation_back(Barrier(len(qr)), qargs=qr, cargs=[])
+            for gate in gates:
+                new_dag.apply_operation_back(
+                    gate.op, qargs=gate.qargs, cargs=gate.cargs
+                )
+            if moment_type == "two":
+                new_dag.apply_operation_back(Barrier(len(qr)), qargs=qr, cargs=[])
+            fenced = moment_type == "two"
+
+        # greedy packing is not optimal, so never return a deeper circuit
+        moments_before = self._count_moments(dag)
+        moments_after = self._count_moments(new_dag)
+        if moments_after >= moments_before:
+            new_dag, moments_after = dag, moments_before
+
+        self._report = {
+            "moments_before": moments_before,
+            "moments_after": moments_after,
+        }
+        return new_dag
+
+    def get_report(self) -> dict[str, int]:
+        return self._report
@@ -80,7 +80,7 @@ class SlideOneQubitOps(TransformationPass):
                 two_q_moment = moments[i + 1][0]
 
             # slide back to available wires
-            if i > 1:
+            if last_one_q_moment is not None:
                 removed = []
                 for gate in one_q_moment[0].op_nodes():
                     if all([q not in used_qargs for q in gate.qargs]):
@@ -98,6 +98,8 @@ class SlideOneQubitOps(TransformationPass):
                     for q in gate.qargs:
                         used_qargs.add(q)
             if len(one_q_moment) == 0:
+                # nothing to slide into past this two-qubit moment
+                last_one_q_moment = None
                 continue
             for gate in one_q_moment[-1].op_nodes():
                 for q in gate.qargs:
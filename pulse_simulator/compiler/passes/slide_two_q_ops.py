@@ -85,7 +85,7 @@ class SlideTwoQubitOps(TransformationPass):
                         used_qargs.add(q)
 
             # slide back to available wires
-            if i > 1:
+            if last_two_q_moment is not None:
                 removed = []
                 for gate in two_q_moment[0].op_nodes():
                     if all([q not in used_qargs for q in gate.qargs]):
@@ -99,6 +99,8 @@ class SlideTwoQubitOps(TransformationPass):
             # keep track of used wires
             used_qargs = set()
             if len(two_q_moment) == 0:
+                # nothing to slide into past this one-qubit moment
+                last_two_q_moment = None
                 continue
             for gate in two_q_moment[-1].op_nodes():
                 for q in gate.qargs:
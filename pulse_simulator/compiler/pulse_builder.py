@@ -1,4 +1,5 @@
 import qiskit
+import numpy as np
 import pulse_simulator as ps
 
 from qiskit import QuantumCircuit, QuantumRegister
@@ -10,6 +11,8 @@ from qiskit.converters import circuit_to_dag
 from qiskit.transpiler.passes import RemoveBarriers
 
 from .scheduler import RobustScheduler
+from .passes import parameter_namespace
+from .coloring import pulse_coloring
 
 
 class PulseBuilder:
@@ -21,9 +24,11 @@ class PulseBuilder:
         control_pulses: dict[str, qiskit.pulse.Waveform],
         target_pulses: dict[str, qiskit.pulse.Waveform],
         backend: BackendV2,
+        crosstalk_graph: list[tuple[int, int]] | None = None,
     ):
         self._basis_gates = basis_gates
         self._coupling_map = coupling_map
+        self._crosstalk_graph = crosstalk_graph
         self._one_q_pulses = one_q_pulses
         self._control_pulses = control_pulses
         self._target_pulses = target_pulses
@@ -38,8 +43,16 @@ class PulseBuilder:
             attach_final_virtual=False,
         )
 
-    def build(self, circuit: QuantumCircuit):
+    def build(self, circuit: QuantumCircuit, merged: bool = False):
+        """Build the pulses of a circuit.
+
+        Returns one schedule block per moment, or with `merged` a single
+        schedule of the whole circuit where each moment starts when the
+        longest pulse of the previous moment ends.
+        """
         moments = self._build_moments_dicts(circuit)
+        if merged:
+            return self._build_merged_schedule(moments)
         pulses = []
 
         for moment in moments:
@@ -54,6 +67,58 @@ class PulseBuilder:
 
         return pulses
 
+    def build_channel_samples(
+        self, circuit: QuantumCircuit
+    ) -> tuple[dict[str, np.ndarray], list[int]]:
+        """Build the samples of every channel for the whole circuit.
+
+        Returns:
+            The samples by channel name, all as long as the circuit, and the
+            start offset of each moment in samples.
+        """
+        moment_plays, offsets, duration = self._plan_moments(
+            self._build_moments_dicts(circuit)
+        )
+        samples = {}
+        for plays, offset in zip(moment_plays, offsets):
+            for channel, pulse in plays:
+                if channel.name not in samples:
+                    samples[channel.name] = np.zeros(duration, dtype=complex)
+                samples[channel.name][offset : offset + pulse.duration] = pulse.samples
+        return samples, offsets
+
+    def _build_merged_schedule(self, moments: list) -> qiskit.pulse.Schedule:
+        # plays are inserted directly at their offsets, which skips the
+        # builder context of every moment
+        moment_plays, offsets, _ = self._plan_moments(moments)
+        schedule = qiskit.pulse.Schedule(name="Circuit")
+        for plays, offset in zip(moment_plays, offsets):
+            for channel, pulse in plays:
+                schedule.insert(offset, qiskit.pulse.Play(pulse, channel), inplace=True)
+        return schedule
+
+    def _plan_moments(self, moments: list) -> tuple[list, list[int], int]:
+        moment_plays = []
+        offsets = []
+        offset = 0
+        for gates, virtual_zs, n_qubits in moments:
+            if n_qubits == 1:
+                plays = [
+                    (qiskit.pulse.DriveChannel(i), self._one_q_pulses[gate])
+                    for i, gate in gates.items()
+                ]
+            elif n_qubits == 2:
+                plays = []
+                for (c, t), gate in gates.items():
+                    control_channel = ps.get_control_channel(c, t, self._backend)
+                    target_channel = ps.get_drive_channel(t, self._backend)
+                    plays.append((control_channel, self._control_pulses[gate]))
+                    plays.append((target_channel, self._target_pulses[gate]))
+            moment_plays.append(plays)
+            offsets.append(offset)
+            offset += max([pulse.duration for _, pulse in plays] + [0])
+        return moment_plays, offsets, offset
+
     def _build_single_qubit_pulse(
         self, gates: dict[int, str], virtual_zs: dict[int, float]
     ) -> qiskit.pulse.Waveform:
@@ -106,6 +171,7 @@ class PulseBuilder:
         one_q_coloring, two_q_coloring = self._get_coloring(n)
 
         # scheduled circuits and get output dag
+        namespace = parameter_namespace(circuit)
         circuit = RemoveBarriers()(circuit)
         scheduled_dag = self._scheduler.run(circuit, return_dag=True)
         subdags: list[DAGCircuit] = [layer["graph"] for layer in scheduled_dag.layers()]
@@ -130,19 +196,21 @@ class PulseBuilder:
                     gates_dict[index] = f"{gate.op.name}_{color}"
 
                     if virtual := gate.op.label:
-                        virtual_zs.update(self._virtual_str_to_dict(virtual))
+                        virtual_zs.update(self._virtual_str_to_dict(virtual, namespace))
 
                 # two-qubit operation
                 elif len(qargs) == 2:
                     q0, q1 = qargs[0], qargs[1]
                     i0 = scheduled_dag.find_bit(q0).index
                     i1 = scheduled_dag.find_bit(q1).index
-                    color = two_q_coloring[tuple({i0, i1})]
+                    color = two_q_coloring[tuple(sorted((i0, i1)))]
                     gates_dict[(i0, i1)] = f"{gate.op.name}_{color}"
 
                     if virtuals := gate.op.label:
                         for virtual in virtuals.split("&"):
-                            virtual_zs.update(self._virtual_str_to_dict(virtual))
+                            virtual_zs.update(
+                                self._virtual_str_to_dict(virtual, namespace)
+                            )
 
             if gates_dict:
                 moments.append((gates_dict, virtual_zs, len(qargs)))
@@ -150,28 +218,20 @@ class PulseBuilder:
         if final_virtuals := self._scheduler._final_virtuals:
             virtual_zs = {}
             for qubit in final_virtuals:
-                virtual_zs.update(self._virtual_str_to_dict(final_virtuals[qubit]))
+                virtual_zs.update(
+                    self._virtual_str_to_dict(final_virtuals[qubit], namespace)
+                )
             moments.append(({}, virtual_zs, 1))
 
         return moments
 
-    # TODO: generalize for any connectivity?
     def _get_coloring(self, n: int) -> tuple[dict[int, str], dict[int, str]]:
-        one_q_coloring = {
-            qubit: "red" if qubit % 2 == 0 else "blue" for qubit in range(n)
-        }
-
-        flag = True
-        two_q_coloring = {}
-        for qubit in range(n - 1):
-            if qubit % 2 == 0:
-                flag = not flag
-            two_q_coloring[tuple({qubit, qubit + 1})] = "blue" if flag else "red"
-
-        return one_q_coloring, two_q_coloring
+        return pulse_coloring(n, self._coupling_map, self._crosstalk_graph)
 
-    def _virtual_str_to_dict(self, virtual: str) -> dict[int, str]:
+    def _virtual_str_to_dict(
+        self, virtual: str, namespace: dict | None = None
+    ) -> dict[int, str]:
         processed = virtual.split("|")
-        params = eval(processed[1])
+        params = eval(processed[1], globals(), namespace)
         qargs = eval(processed[2])
         return {qargs._index: params[0]}
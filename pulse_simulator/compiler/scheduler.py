@@ -1,3 +1,6 @@
+import functools
+from collections import OrderedDict
+
 from qiskit import QuantumCircuit, transpile
 from qiskit.dagcircuit import DAGCircuit
 from qiskit.transpiler import CouplingMap, PassManager
@@ -11,7 +14,17 @@ from .passes import (
     AttachVirtualGates,
     ExpandVirtualGates,
     MergeAdjacentRzs,
+    PackMoments,
+    parameter_namespace,
 )
+from .circuit_key import circuit_key
+
+
+@functools.lru_cache(maxsize=None)
+def _linear_coupling_map(num_qubits: int) -> CouplingMap:
+    if num_qubits == 1:
+        return CouplingMap([[0, 0]])
+    return CouplingMap([[i, i + 1] for i in range(num_qubits - 1)])
 
 
 class RobustScheduler:
@@ -21,6 +34,8 @@ class RobustScheduler:
         coupling_map: CouplingMap | None = None,
         reattach: bool = True,
         attach_final_virtual: bool = True,
+        pack_moments: bool = False,
+        transpile_cache_size: int = 128,
     ):
         pm = PassManager(
             [
@@ -36,17 +51,33 @@ class RobustScheduler:
         self._coupling_map = coupling_map
         self._reattach = reattach
         self._attach_final_virtual = attach_final_virtual
+        self._pack_moments = pack_moments
+        self._packing_report = None
+        self._transpile_cache = OrderedDict()
+        self._transpile_cache_size = transpile_cache_size
         self._pm = pm
 
+    def get_packing_report(self) -> dict[str, int] | None:
+        """Number of moments before and after packing in the last run."""
+        return self._packing_report
+
     def _transpile(self, qc: QuantumCircuit) -> QuantumCircuit:
         basis_gates = self._basis_gates
         coupling_map = self._coupling_map
+        cache = self._transpile_cache
+
+        # circuits with the same structure (and registers) transpile the same
+        key = (
+            circuit_key(qc),
+            tuple((reg.name, reg.size) for reg in qc.qregs + qc.cregs),
+        )
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
 
         # if not given, coupling map is linear
         if coupling_map is None:
-            coupling_map = CouplingMap([[i, i + 1] for i in range(qc.num_qubits - 1)])
-            if qc.num_qubits == 1:
-                coupling_map = CouplingMap([[0, 0]])
+            coupling_map = _linear_coupling_map(qc.num_qubits)
         transpiled_qc = transpile(
             qc,
             basis_gates=basis_gates,
@@ -54,6 +85,10 @@ class RobustScheduler:
             seed_transpiler=12345,  # set seed for testing
             optimization_level=0,
         )
+
+        cache[key] = transpiled_qc
+        if len(cache) > self._transpile_cache_size:
+            cache.popitem(last=False)
         return transpiled_qc
 
     def _schedule(self, qc: QuantumCircuit) -> QuantumCircuit:
@@ -85,7 +120,13 @@ class RobustScheduler:
                 flag = True
             last_qc = next_qc
 
-        expand_pass = ExpandVirtualGates()
+        # Optionally repack the moments to minimize their number
+        if self._pack_moments:
+            pack_pass = PackMoments()
+            last_qc = dag_to_circuit(pack_pass.run(circuit_to_dag(last_qc)))
+            self._packing_report = pack_pass.get_report()
+
+        expand_pass = ExpandVirtualGates(namespace=parameter_namespace(qc))
         # Reattach virtual gates only if indicated
         if not self._reattach:
             final_dag = circuit_to_dag(last_qc)
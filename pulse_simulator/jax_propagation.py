@@ -0,0 +1,52 @@
+import jax
+import jax.numpy as jnp
+
+# NOTE:     These functions are written in JAX so that they can be jitted and
+#           differentiated, e.g. with respect to the pulse samples. They work
+#           for any Hamiltonian of the form H(t) = H_0 + Σ_j c_j(t) H_j, such
+#           as those of `rx_model` and `cross_resonance_model`.
+
+
+def piecewise_constant_propagator(
+    static_hamiltonian, hamiltonian_operators, coefficients, dt
+):
+    """Propagator of a Hamiltonian with piecewise constant coefficients.
+
+    Arguments:
+        static_hamiltonian (Array) -- Static Hamiltonian H_0.
+        hamiltonian_operators (Array) -- Control Hamiltonians H_j, with shape
+            (number of controls, dim, dim).
+        coefficients (Array) -- Real coefficient c_j of each control in each
+            time step, with shape (number of controls, number of steps).
+        dt (Float) -- Duration of a time step.
+
+    Returns:
+        (Array) The propagator Π_k exp(-i dt H_k), latest step on the left.
+    """
+    static_hamiltonian = jnp.asarray(static_hamiltonian)
+    hamiltonian_operators = jnp.asarray(hamiltonian_operators)
+
+    def step(propagator, step_coefficients):
+        hamiltonian = static_hamiltonian + jnp.tensordot(
+            step_coefficients, hamiltonian_operators, axes=1
+        )
+        return jax.scipy.linalg.expm(-1j * dt * hamiltonian) @ propagator, None
+
+    identity = jnp.eye(static_hamiltonian.shape[0], dtype=complex)
+    propagator, _ = jax.lax.scan(step, identity, jnp.asarray(coefficients).T)
+    return propagator
+
+
+def static_propagator(static_hamiltonian, duration):
+    """Propagator exp(-i duration H_0) of the static Hamiltonian."""
+    return jax.scipy.linalg.expm(-1j * duration * jnp.asarray(static_hamiltonian))
+
+
+def unitary_fidelity(propagator, target):
+    """Fidelity |Tr(V† U)|² / d² of a propagator U to a target unitary V.
+
+    This is the process fidelity of the two unitaries and ignores the global
+    phase.
+    """
+    dim = target.shape[0]
+    return jnp.abs(jnp.trace(jnp.conj(target).T @ propagator)) ** 2 / dim**2
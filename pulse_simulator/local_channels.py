@@ -0,0 +1,195 @@
+import numpy as np
+import scipy.linalg
+
+from .qiskit_operator_labels import from_label
+
+# NOTE:     Superoperators act on density matrices flattened row by row, so that
+#           vec(A ρ B) = (A ⊗ B^T) vec(ρ). Qubit `q` of an n-qubit operator is
+#           axis `q` of its tensor, i.e. register 0 is the most significant
+#           qubit as in the operators built with `from_label`.
+
+
+def dissipator_superoperator(jump_ops):
+    """Superoperator of the Lindblad dissipator of a set of jump operators.
+
+    Arguments:
+        jump_ops (List[Operator]) -- Jump operators L_k.
+
+    Returns:
+        (NumPy.ndarray) Matrix of ρ -> Σ_k L_k ρ L_k† - ½ {L_k† L_k, ρ}.
+    """
+    dim = np.asarray(jump_ops[0]).shape[0] if jump_ops else 2
+    identity = np.eye(dim)
+    superop = np.zeros((dim**2, dim**2), dtype=complex)
+    for jump_op in jump_ops:
+        L = np.asarray(jump_op, dtype=complex)
+        LdL = L.conj().T @ L
+        superop += np.kron(L, L.conj())
+        superop -= 0.5 * np.kron(LdL, identity)
+        superop -= 0.5 * np.kron(identity, LdL.T)
+    return superop
+
+
+def dissipator_channel(jump_ops, duration):
+    """Channel of the Lindblad dissipator evolved for a duration.
+
+    Arguments:
+        jump_ops (List[Operator]) -- Jump operators L_k.
+        duration (Float) -- Evolution time.
+
+    Returns:
+        (NumPy.ndarray) Superoperator of the channel.
+    """
+    return scipy.linalg.expm(duration * dissipator_superoperator(jump_ops))
+
+
+def apply_local_superoperator(rho, superop, qubit, num_qubits):
+    """Apply a one-qubit superoperator to one qubit of a density matrix.
+
+    Arguments:
+        rho (NumPy.ndarray) -- Density matrix of the register.
+        superop (NumPy.ndarray) -- 4x4 one-qubit superoperator.
+        qubit (Int) -- Index of the qubit in the register.
+        num_qubits (Int) -- Number of qubits in the register.
+
+    Returns:
+        (NumPy.ndarray) New density matrix.
+    """
+    dim = 2**num_qubits
+    tensor = rho.reshape((2,) * (2 * num_qubits))
+    tensor = np.moveaxis(tensor, (qubit, num_qubits + qubit), (0, 1))
+    shape = tensor.shape
+    tensor = (superop @ tensor.reshape(4, -1)).reshape(shape)
+    tensor = np.moveaxis(tensor, (0, 1), (qubit, num_qubits + qubit))
+    return tensor.reshape(dim, dim)
+
+
+def apply_local_operator(states, operator, qubit, num_qubits):
+    """Apply a one-qubit operator to one qubit of a batch of state vectors.
+
+    Arguments:
+        states (NumPy.ndarray) -- State vectors of the register as columns, or
+            a single state vector.
+        operator (NumPy.ndarray) -- 2x2 one-qubit operator, or one of shape
+            (levels, levels) for a register of transmons with `levels` levels.
+        qubit (Int) -- Index of the qubit in the register.
+        num_qubits (Int) -- Number of qubits in the register.
+
+    Returns:
+        (NumPy.ndarray) New states with the shape of `states`.
+    """
+    shape = states.shape
+    tensor = states.reshape((len(operator),) * num_qubits + shape[1:])
+    tensor = np.tensordot(operator, tensor, axes=([1], [qubit]))
+    tensor = np.moveaxis(tensor, 0, qubit)
+    return tensor.reshape(shape)
+
+
+def apply_two_qubit_operator(states, operator, qubits, num_qubits):
+    """Apply a two-qubit operator to two qubits of a batch of state vectors.
+
+    Arguments:
+        states (NumPy.ndarray) -- State vectors of the register as columns, or
+            a single state vector.
+        operator (NumPy.ndarray) -- 4x4 two-qubit operator, with the first of
+            `qubits` the most significant.
+        qubits (Tuple(Int, Int)) -- Indices of the qubits in the register.
+        num_qubits (Int) -- Number of qubits in the register.
+
+    Returns:
+        (NumPy.ndarray) New states with the shape of `states`.
+    """
+    shape = states.shape
+    tensor = states.reshape((2,) * num_qubits + shape[1:])
+    operator = operator.reshape(2, 2, 2, 2)
+    tensor = np.tensordot(operator, tensor, axes=([2, 3], list(qubits)))
+    tensor = np.moveaxis(tensor, (0, 1), qubits)
+    return tensor.reshape(shape)
+
+
+def kraus_operators(superop, atol=1e-12):
+    """Kraus operators of a one-qubit channel.
+
+    Arguments:
+        superop (NumPy.ndarray) -- 4x4 superoperator of the channel.
+        atol [optional] (Float) -- Eigenvalues of the Choi matrix below this
+            tolerance are dropped.
+
+    Returns:
+        (List[NumPy.ndarray]) 2x2 operators K_k with ρ -> Σ_k K_k ρ K_k†.
+    """
+    # reshuffling the superoperator Σ K ⊗ K̄ gives Σ vec(K) vec(K)†
+    choi = superop.reshape(2, 2, 2, 2).transpose(0, 2, 1, 3).reshape(4, 4)
+    eigenvalues, eigenvectors = np.linalg.eigh(choi)
+    return [
+        np.sqrt(value) * eigenvectors[:, k].reshape(2, 2)
+        for k, value in enumerate(eigenvalues)
+        if value > atol
+    ]
+
+
+def sample_local_kraus(states, kraus_ops, qubit, num_qubits, rng):
+    """Apply one random Kraus operator to one qubit of each state in a batch.
+
+    Each state picks operator K_k with probability ||K_k ψ||², so that the
+    average over the batch follows the channel (quantum trajectories).
+
+    Arguments:
+        states (NumPy.ndarray) -- Normalized state vectors as columns.
+        kraus_ops (List[NumPy.ndarray]) -- 2x2 Kraus operators.
+        qubit (Int) -- Index of the qubit in the register.
+        num_qubits (Int) -- Number of qubits in the register.
+        rng (NumPy.random.Generator) -- Random number generator.
+
+    Returns:
+        (NumPy.ndarray) Normalized states after the jumps.
+    """
+    branches = np.stack(
+        [apply_local_operator(states, K, qubit, num_qubits) for K in kraus_ops]
+    )
+    weights = np.cumsum(np.sum(np.abs(branches) ** 2, axis=1), axis=0)
+    draws = rng.random(states.shape[1]) * weights[-1]
+    choice = np.minimum(np.sum(weights < draws, axis=0), len(kraus_ops) - 1)
+    chosen = branches[choice, :, np.arange(states.shape[1])].T
+    return chosen / np.linalg.norm(chosen, axis=0)
+
+
+def local_operators(observable, num_qubits):
+    """The one-qubit factors of a product observable.
+
+    Arguments:
+        observable (Str or Dict{Int: Str}) -- Label as made by `to_label`,
+            with the character of register 0 first, or a dict of characters
+            by register. Characters are those of `from_label`.
+        num_qubits (Int) -- Number of qubits in the register.
+
+    Returns:
+        (Dict{Int: NumPy.ndarray}) 2x2 operators of the non-identity factors.
+    """
+    if isinstance(observable, str):
+        if len(observable) != num_qubits:
+            raise ValueError(f"Label {observable} does not match {num_qubits} qubits.")
+        observable = dict(enumerate(observable))
+    return {
+        qubit: from_label(char).data
+        for qubit, char in observable.items()
+        if char != "I"
+    }
+
+
+def local_expectation(states, operators, num_qubits):
+    """Expectation values of a product observable in a batch of states.
+
+    Arguments:
+        states (NumPy.ndarray) -- State vectors of the register as columns.
+        operators (Dict{Int: NumPy.ndarray}) -- One-qubit factors, see
+            `local_operators`.
+        num_qubits (Int) -- Number of qubits in the register.
+
+    Returns:
+        (NumPy.ndarray) Expectation value in each state.
+    """
+    transformed = states
+    for qubit, operator in operators.items():
+        transformed = apply_local_operator(transformed, operator, qubit, num_qubits)
+    return np.sum(states.conj() * transformed, axis=0)
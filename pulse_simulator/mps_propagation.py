@@ -0,0 +1,141 @@
+import numpy as np
+
+# NOTE:     Site k of a matrix product state is qubit k, the most significant
+#           qubit of the state vector as in the operators built with
+#           `from_label`. Two-qubit gates act on neighbouring sites only, and
+#           the state is kept in mixed canonical form around `center` so that
+#           the truncation of each bond is optimal for the whole state.
+
+
+class MatrixProductState:
+    """Matrix product state of a chain of qubits, initially |0...0>.
+
+    Arguments:
+        num_qubits (Int) -- Number of sites of the chain.
+        max_bond [optional] (Int) -- Largest bond dimension kept. Defaults to
+            no limit.
+        cutoff [optional] (Float) -- Largest discarded weight, relative to the
+            norm of the bond, of the singular values dropped at a bond.
+    """
+
+    def __init__(self, num_qubits, max_bond=None, cutoff=1e-12):
+        self.max_bond = max_bond
+        self.cutoff = cutoff
+        self.tensors = []
+        for _ in range(num_qubits):
+            tensor = np.zeros((1, 2, 1), dtype=complex)
+            tensor[0, 0, 0] = 1.0
+            self.tensors.append(tensor)
+        self.center = 0
+        # sum of the discarded weights, which bounds the infidelity to first
+        # order
+        self.truncation_error = 0.0
+
+    @property
+    def num_qubits(self):
+        return len(self.tensors)
+
+    @property
+    def bond_dimensions(self):
+        return [tensor.shape[2] for tensor in self.tensors[:-1]]
+
+    def apply_one_qubit(self, operator, site):
+        """Apply a 2x2 unitary to a site, which keeps the canonical form."""
+        self.tensors[site] = np.einsum("ij,ljr->lir", operator, self.tensors[site])
+
+    def apply_two_qubit(self, operator, site, center_right=True):
+        """Apply a 4x4 unitary to the sites `site` and `site + 1`.
+
+        The bond between the sites is truncated, and the discarded weight is
+        added to `truncation_error`.
+
+        Arguments:
+            operator (NumPy.ndarray) -- 4x4 unitary, with `site` the most
+                significant qubit.
+            site (Int) -- Left site of the pair.
+            center_right [optional] (Bool) -- Leave the canonical center on
+                the right site, otherwise on the left one. Sweeps to the left
+                save moving the center back. Defaults to True.
+
+        Returns:
+            (Float) Discarded weight of the bond.
+        """
+        self.move_center(site + 1 if self.center > site else site)
+        left, right = self.tensors[site], self.tensors[site + 1]
+        theta = np.einsum("lia,ajr->lijr", left, right)
+        theta = np.einsum("abij,lijr->labr", operator.reshape(2, 2, 2, 2), theta)
+        dim_left, dim_right = left.shape[0], right.shape[2]
+        u, s, vh = np.linalg.svd(
+            theta.reshape(2 * dim_left, 2 * dim_right), full_matrices=False
+        )
+
+        weights = s**2 / np.sum(s**2)
+        # keep the fewest singular values whose tail weight is below cutoff
+        tails = np.cumsum(weights[::-1])[::-1]
+        keep = max(1, int(np.sum(tails > self.cutoff)))
+        if self.max_bond is not None:
+            keep = min(keep, self.max_bond)
+        discarded = float(np.sum(weights[keep:]))
+        s = s[:keep] / np.linalg.norm(s[:keep])
+
+        u = u[:, :keep].reshape(dim_left, 2, keep)
+        vh = vh[:keep].reshape(keep, 2, dim_right)
+        if center_right:
+            self.tensors[site] = u
+            self.tensors[site + 1] = s[:, None, None] * vh
+            self.center = site + 1
+        else:
+            self.tensors[site] = u * s
+            self.tensors[site + 1] = vh
+            self.center = site
+        self.truncation_error += discarded
+        return discarded
+
+    def apply_diagonal_two_qubit(self, diagonal, site, center_right=True):
+        """Apply a two-qubit diagonal unitary, see `apply_two_qubit`."""
+        return self.apply_two_qubit(np.diag(diagonal), site, center_right)
+
+    def move_center(self, site):
+        """Move the canonical center to a site with QR decompositions."""
+        tensors = self.tensors
+        while self.center < site:
+            k = self.center
+            dim_left, _, dim_right = tensors[k].shape
+            q, r = np.linalg.qr(tensors[k].reshape(2 * dim_left, dim_right))
+            tensors[k] = q.reshape(dim_left, 2, -1)
+            tensors[k + 1] = np.einsum("ab,bjr->ajr", r, tensors[k + 1])
+            self.center += 1
+        while self.center > site:
+            k = self.center
+            dim_left, _, dim_right = tensors[k].shape
+            q, r = np.linalg.qr(tensors[k].reshape(dim_left, 2 * dim_right).T)
+            tensors[k] = q.T.reshape(-1, 2, dim_right)
+            tensors[k - 1] = np.einsum("lia,ba->lib", tensors[k - 1], r)
+            self.center -= 1
+
+    def expectation(self, operators):
+        """Expectation value of a product observable.
+
+        Arguments:
+            operators (Dict{Int: NumPy.ndarray}) -- 2x2 operators of the
+                non-identity factors by site, e.g. from `local_operators`.
+
+        Returns:
+            (Complex) Expectation value.
+        """
+        environment = np.ones((1, 1), dtype=complex)
+        for site, tensor in enumerate(self.tensors):
+            if site in operators:
+                ket = np.einsum("ij,ljr->lir", operators[site], tensor)
+            else:
+                ket = tensor
+            environment = np.einsum("ab,aic,bid->cd", environment, tensor.conj(), ket)
+        return environment[0, 0]
+
+    def to_statevector(self):
+        """State vector of the chain, with site 0 the most significant qubit."""
+        state = np.ones((1, 1), dtype=complex)
+        for tensor in self.tensors:
+            state = np.einsum("sa,aib->sib", state, tensor)
+            state = state.reshape(-1, tensor.shape[2])
+        return state[:, 0]
@@ -112,3 +112,23 @@ def rx_model(
         return drift_op, [control_op], [control_ch], params
     else:
         return drift_op, [control_op], [control_ch]
+
+
+def rx_local_model(qubit, backend, variables, rotating_frame=False):
+    """Construct the single qubit model of `rx_model` as 2x2 operators of the
+    qubit alone, for simulations that never form register operators.
+
+    Arguments:
+        qubit (Int) -- Qubit index
+        backend (qk.providers.fake_provider.FakePulseBackend) -- Backend
+            needed for drive channels.
+        variables (Dict{Str, Int}) -- Backend configuration properties.
+        rotating_frame (Bool) -- Use the rotating frame. Default false.
+
+    Returns:
+        Drift operator, List[Control operators], List[Drive channels]
+    """
+    drift_op, control_ops, control_chs = rx_model(
+        qubit, [qubit], backend, variables, rotating_frame=rotating_frame
+    )
+    return drift_op.data, [op.data for op in control_ops], control_chs
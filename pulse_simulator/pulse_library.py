@@ -0,0 +1,146 @@
+import functools
+import os
+import numpy as np
+import qiskit
+
+ONE_QUBIT_PULSE_NAMES = ["x_blue", "x_red", "sx_blue", "sx_red"]
+ONE_QUBIT_PULSE_ANGLES = [np.pi / 2, np.pi / 2, np.pi / 4, np.pi / 4]
+TWO_QUBIT_PULSE_NAMES = [
+    "cx_control_blue",
+    "cx_control_red",
+    "cx_target_blue",
+    "cx_target_red",
+]
+PULSE_FILE_EXTENSIONS = (".csv", ".npz")
+
+
+def load_pulse_array(file_name):
+    """Load the pulses of a saved pulse set as a contiguous array.
+
+    Arguments:
+        file_name (Str) -- CSV file with one pulse per row, or an `.npz`
+            file written by `save_pulse_array`.
+
+    Returns:
+        (NumPy.ndarray) Array of shape (number of pulses, number of samples).
+    """
+    if file_name.endswith(".npz"):
+        with np.load(file_name) as data:
+            pulses = data["pulses"]
+    else:
+        pulses = np.loadtxt(file_name, delimiter=",", ndmin=2)
+    return np.ascontiguousarray(pulses, dtype=float)
+
+
+def save_pulse_array(file_name, pulses):
+    """Save pulses in the binary `.npz` pulse format.
+
+    Arguments:
+        file_name (Str) -- Output file.
+        pulses (NumPy.ndarray) -- Array of shape (number of pulses, number
+            of samples).
+    """
+    np.savez(file_name, pulses=np.asarray(pulses, dtype=float))
+
+
+def normalize_pulses(pulses, dt, angles):
+    """Rescale each pulse so that its area is the expected rotation angle.
+
+    Arguments:
+        pulses (NumPy.ndarray) -- Array of shape (number of pulses, number
+            of samples).
+        dt (Float) -- Sample time.
+        angles (List[Float]) -- Expected angle of each pulse.
+
+    Returns:
+        (NumPy.ndarray) Normalized pulses.
+    """
+    areas = np.trapz(pulses, dx=dt, axis=1)
+    return pulses * (np.asarray(angles) / areas)[:, None]
+
+
+def default_pulse_names(num_pulses):
+    """The gate names of the rows in a saved pulse set.
+
+    Sets with four rows are single qubit gatesets. Other sets, such as the
+    two-qubit pulses of `TWO_QUBIT_PULSE_NAMES`, are saved in their own units
+    and layouts, so their names must be given.
+
+    Raises:
+        ValueError: The set is not a single qubit gateset.
+    """
+    if num_pulses == len(ONE_QUBIT_PULSE_NAMES):
+        return ONE_QUBIT_PULSE_NAMES
+    raise ValueError(
+        f"Pulse set with {num_pulses} rows is not a single qubit gateset, "
+        f"pass the names of its pulses."
+    )
+
+
+def load_pulse_library(file_name, dt, names=None, angles=None):
+    """Load a saved pulse set as waveforms ready for `Simulator.set_pulse`.
+
+    Results are cached by file, modification time and arguments, so loading
+    the same pulse set again returns the already converted waveforms.
+
+    Arguments:
+        file_name (Str) -- CSV or `.npz` pulse file.
+        dt (Float) -- Sample time used for the area normalization.
+        names [optional] (List[Str]) -- Gate name of each row. Required
+            unless the file is a single qubit gateset, see
+            `default_pulse_names`.
+        angles [optional] (List[Float]) -- Expected angle of each row. Single
+            qubit gatesets default to `ONE_QUBIT_PULSE_ANGLES`, other sets are
+            not normalized by default.
+
+    Returns:
+        Dict{Str: qiskit.pulse.Waveform}
+    """
+    file_name = os.path.abspath(file_name)
+    library = _load_pulse_library(
+        file_name,
+        os.path.getmtime(file_name),
+        dt,
+        None if names is None else tuple(names),
+        None if angles is None else tuple(angles),
+    )
+    return dict(library)
+
+
+def load_pulse_directory(directory, dt, names=None, angles=None):
+    """Load every saved pulse set in a directory.
+
+    Arguments:
+        directory (Str) -- Directory of CSV and `.npz` pulse files.
+        dt (Float) -- Sample time used for the area normalization.
+        names [optional] (List[Str]) -- See `load_pulse_library`.
+        angles [optional] (List[Float]) -- See `load_pulse_library`.
+
+    Returns:
+        Dict{Str: Dict{Str: qiskit.pulse.Waveform}} keyed by file name
+        without extension.
+    """
+    libraries = {}
+    for file_name in sorted(os.listdir(directory)):
+        variant, extension = os.path.splitext(file_name)
+        if extension in PULSE_FILE_EXTENSIONS:
+            libraries[variant] = load_pulse_library(
+                os.path.join(directory, file_name), dt, names=names, angles=angles
+            )
+    return libraries
+
+
+@functools.lru_cache(maxsize=128)
+def _load_pulse_library(file_name, mtime, dt, names, angles):
+    pulses = load_pulse_array(file_name)
+    if names is None:
+        names = default_pulse_names(len(pulses))
+    if angles is None and list(names) == ONE_QUBIT_PULSE_NAMES:
+        angles = ONE_QUBIT_PULSE_ANGLES
+    if angles is not None:
+        pulses = normalize_pulses(pulses, dt, angles)
+
+    return {
+        name: qiskit.pulse.Waveform(pulse, name=name, limit_amplitude=False)
+        for name, pulse in zip(names, pulses)
+    }
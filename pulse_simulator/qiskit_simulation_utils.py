@@ -22,6 +22,45 @@ def rz_moment(virtual_zs, registers):
     return quantum_info.Operator(circuit)
 
 
+def rz_diagonal(virtual_zs, registers):
+    """Find the diagonal of a moment of Z rotations.
+
+    The first entry of `registers` is the most significant qubit, matching
+    the operators built with `from_label` and `to_label`. Registers without
+    an entry in `virtual_zs` are not rotated.
+
+    Arguments:
+        virtual_zs (Dict{Int: Float}) -- R_z qubit and angle dictionary.
+        registers (List[Int]) -- Active registers.
+
+    Returns:
+        (NumPy.ndarray) Diagonal of the moment unitary.
+    """
+    phases = [
+        np.exp(0.5j * np.array([-1.0, 1.0]) * virtual_zs.get(r, 0.0)) for r in registers
+    ]
+    return functools.reduce(np.kron, phases)
+
+
+def qubit_reversal_permutation(n_qubits):
+    """Permutation of basis indices that reverses the order of the qubits.
+
+    Indexing a state with it converts between the qiskit ordering and the
+    ordering of operators built with `from_label` (and back).
+
+    Arguments:
+        n_qubits (Int) -- Number of qubits.
+
+    Returns:
+        (NumPy.ndarray) Permuted basis indices.
+    """
+    index = np.arange(2**n_qubits)
+    reversed_index = np.zeros_like(index)
+    for i in range(n_qubits):
+        reversed_index |= ((index >> i) & 1) << (n_qubits - 1 - i)
+    return reversed_index
+
+
 def qiskit_ground_state(n_qubits):
     return quantum_info.states.Statevector(
         functools.reduce(np.kron, np.repeat([[1, 0]], n_qubits, axis=0))
@@ -0,0 +1,181 @@
+import itertools
+import re
+import jax
+import numpy as np
+from qiskit.quantum_info import Operator
+
+from .qiskit_operator_labels import from_label, to_label
+from .qiskit_backend_utils import (
+    vars_anharmonicity,
+    vars_coupling,
+    vars_frequency,
+    vars_rabi,
+)
+from .two_qubit_models import zz_coupling_strengths, zz_diagonal
+from .jax_propagation import (
+    piecewise_constant_propagator,
+    static_propagator,
+    unitary_fidelity,
+)
+
+# NOTE:     The perturbed Hamiltonians are those of the simulations in
+#           `test.py`: `rx_model` drives (without the lab frame drift) and the
+#           ZZ terms of `crosstalk_model`. Offsets of the qubit frequencies
+#           enter as detunings (δω/2) Z from the unperturbed drift, besides
+#           changing the ZZ strengths. The drives are linear in the Rabi
+#           rates and the ZZ strengths are computed for all points at once,
+#           so the batch is built without rebuilding any model.
+
+
+def perturbation_points(perturbations, grid=True):
+    """List the offsets of every point of a perturbation sweep.
+
+    Arguments:
+        perturbations (Dict{Str: Array}) -- Offsets of each variable.
+        grid [optional] (Bool) -- Take all combinations of the offsets. If
+            False, the offsets are draws of a distribution and are taken
+            together by index. Defaults to True.
+
+    Returns:
+        (List[Dict{Str: Float}]) Offsets by variable of each point.
+    """
+    names = list(perturbations)
+    values = [np.atleast_1d(perturbations[name]) for name in names]
+    if grid:
+        points = itertools.product(*values)
+    else:
+        if len({len(value) for value in values}) > 1:
+            raise ValueError("Perturbation draws must have the same length.")
+        points = zip(*values)
+    return [dict(zip(names, point)) for point in points]
+
+
+def perturb_variables(variables, offsets):
+    """Add offsets to backend variables.
+
+    Arguments:
+        variables (Dict{Str, Float}) -- Backend configuration properties.
+        offsets (Dict{Str, Float}) -- Offsets by variable name. A family name
+            without qubits, such as "wq" or "omegad", offsets every variable
+            of the family.
+
+    Returns:
+        (Dict{Str, Float}) Perturbed variables.
+    """
+    perturbed = dict(variables)
+    for name, offset in offsets.items():
+        if name in variables:
+            keys = [name]
+        else:
+            keys = [k for k in variables if re.fullmatch(rf"{name}\d+(q\d+)?", k)]
+            if not keys:
+                raise KeyError(f"No variable matches {name}.")
+        for key in keys:
+            perturbed[key] = variables[key] + offset
+    return perturbed
+
+
+def robustness_sweep(
+    pulses,
+    target,
+    registers,
+    graph,
+    variables,
+    perturbations,
+    dt,
+    duration=None,
+    grid=True,
+):
+    """Fidelity of a pulse moment over perturbed backend variables.
+
+    All perturbed Hamiltonians are propagated in one batched JAX solve, so
+    no model or solver is rebuilt per perturbation.
+
+    Arguments:
+        pulses (Dict{Int, NumPy.ndarray}) -- Real pulse samples by qubit.
+        target (Operator) -- Target unitary of the registers, in qiskit
+            ordering.
+        registers (List[Int]) -- Qubits in circuit.
+        graph (List[Tuple(Int, Int)]) -- Undirected crosstalk edges.
+        variables (Dict{Str, Float}) -- Backend configuration properties.
+        perturbations (Dict{Str, Array}) -- Offsets of the variables, see
+            `perturbation_points` and `perturb_variables`.
+        dt (Float) -- Sample time.
+        duration [optional] (Float) -- Integration time of the moment, which
+            is closed by free evolution. Defaults to the window of the
+            Simulator, the number of samples of the longest pulse in time
+            units.
+        grid [optional] (Bool) -- See `perturbation_points`.
+
+    Returns:
+        (NumPy.ndarray) Fidelities with one axis per perturbed variable if
+        `grid`, otherwise one per draw.
+    """
+    points = perturbation_points(perturbations, grid=grid)
+    perturbed = [perturb_variables(variables, offsets) for offsets in points]
+
+    # perturbed qubit properties as arrays with one row per point
+    edges = [e for e in graph if e[0] in registers and e[1] in registers]
+    num_qubits = max(registers) + 1
+    frequencies = np.zeros((len(perturbed), num_qubits))
+    anharmonicities = np.zeros((len(perturbed), num_qubits))
+    for q in {i for e in edges for i in e}:
+        frequencies[:, q] = [v[vars_frequency(q)] for v in perturbed]
+        anharmonicities[:, q] = [v[vars_anharmonicity(q)] for v in perturbed]
+    couplings = np.array(
+        [[v[vars_coupling(*e)] for e in edges] for v in perturbed]
+    ).reshape(len(perturbed), len(edges))
+    detunings = np.array(
+        [
+            [
+                2 * np.pi * (v[vars_frequency(q)] - variables[vars_frequency(q)])
+                for q in registers
+            ]
+            for v in perturbed
+        ]
+    )
+    rabi = np.array(
+        [[2 * np.pi * v[vars_rabi(q)] for q in registers] for v in perturbed]
+    )
+
+    # the crosstalk is diagonal, the drives are the X of each qubit
+    zz = zz_coupling_strengths(edges, frequencies, anharmonicities, couplings)
+    n = len(registers)
+    diagonals = zz_diagonal(zz, edges, list(registers))
+    diagonals = diagonals.reshape((len(perturbed),) + (2,) * n)
+    z = np.array([1.0, -1.0])
+    for k in range(n):
+        shape = [1] * (n + 1)
+        shape[k + 1] = 2
+        diagonals += detunings[:, k].reshape(-1, *[1] * n) / 2 * z.reshape(shape)
+    diagonals = diagonals.reshape(len(perturbed), -1)
+    dim = 2 ** len(registers)
+    static_hamiltonians = np.zeros((len(perturbed), dim, dim), dtype=complex)
+    static_hamiltonians[:, np.arange(dim), np.arange(dim)] = diagonals
+    x_ops = np.array(
+        [from_label(to_label({q: "X"}, registers)).data for q in registers]
+    )
+    operators = rabi[:, :, None, None] * x_ops[None]
+
+    num_samples = max(len(samples) for samples in pulses.values())
+    coefficients = np.zeros((len(registers), num_samples))
+    for qubit, samples in pulses.items():
+        coefficients[registers.index(qubit), : len(samples)] = np.real(samples)
+    if duration is None:
+        # the Simulator integrates a moment to the sample count of its pulse
+        duration = num_samples
+    target = Operator(target).reverse_qargs().data
+
+    def fidelity(static_hamiltonian, hamiltonian_operators):
+        propagator = piecewise_constant_propagator(
+            static_hamiltonian, hamiltonian_operators, coefficients, dt
+        )
+        free = static_propagator(static_hamiltonian, duration - num_samples * dt)
+        return unitary_fidelity(free @ propagator, target)
+
+    fidelities = jax.jit(jax.vmap(fidelity))(static_hamiltonians, operators)
+    fidelities = np.asarray(fidelities)
+    if grid:
+        shape = [np.atleast_1d(value).size for value in perturbations.values()]
+        return fidelities.reshape(shape)
+    return fidelities
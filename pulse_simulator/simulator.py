@@ -1,20 +1,34 @@
+import asyncio
+import functools
+import threading
+from collections import OrderedDict
 import qiskit
 import qiskit_dynamics
 import pulse_simulator as ps
 import numpy as np
+from scipy.stats import norm
 import matplotlib.pyplot as plt
 
 from qiskit import QuantumCircuit, QuantumRegister
-from qiskit.quantum_info import Operator, DensityMatrix
-from qiskit.circuit import Qubit
+from qiskit.quantum_info import Operator, DensityMatrix, Statevector, random_statevector
+from qiskit.circuit import Qubit, Parameter, ParameterExpression
 from qiskit.providers import BackendV2
+from qiskit.result import Counts
 from qiskit.dagcircuit import DAGCircuit
+from qiskit.transpiler import CouplingMap
 from qiskit.transpiler.passes import RemoveBarriers
 
-from .compiler import RobustScheduler
+from .compiler import (
+    RobustScheduler,
+    circuit_key,
+    parameter_key,
+    parameter_namespace,
+    pulse_coloring,
+)
 
 # not sure if this should go here or where
 import jax
+import jax.numpy as jnp
 
 jax.config.update("jax_enable_x64", True)
 jax.config.update("jax_platform_name", "cpu")
@@ -24,7 +38,39 @@ ONE_QUBIT_GATES = ["sx", "x"]
 TWO_QUBIT_GATES = ["cx"]
 VIRTUAL_GATES = ["rz"]
 
+# solver options for the pulse moments, with max_dt in samples. Sampled pulses
+# are constant over each sample, so first-order Magnus steps of one sample are
+# exact; the other presets trade accuracy for fewer or cheaper steps. The
+# "diagonal_drift", "split_operator" and "propagator_table" methods are not
+# solver methods, see `_solve_pulses_split`, `_solve_pulses_local` and
+# `_solve_pulses_table`
+SPLIT_METHODS = ["diagonal_drift", "split_operator", "propagator_table"]
+INTEGRATION_PRESETS = {
+    "exact": {"method": "jax_expm", "max_dt": 1, "magnus_order": 1},
+    "parallel": {"method": "jax_expm_parallel", "max_dt": 1, "magnus_order": 1},
+    "magnus": {"method": "jax_expm", "max_dt": 2, "magnus_order": 2},
+    "adaptive": {"method": "jax_odeint", "atol": 1e-8, "rtol": 1e-8},
+    "diagonal": {"method": "diagonal_drift"},
+    "split2": {"method": "split_operator", "order": 2, "substeps": 1},
+    "split4": {"method": "split_operator", "order": 4, "substeps": 1},
+    "table": {"method": "propagator_table"},
+}
+
+# dtypes of the propagators and states; the solves themselves always run in
+# double precision since x64 is enabled for all of jax above
+PRECISIONS = {"double": np.complex128, "single": np.complex64}
+
+# longest period, in moments, of the repeated blocks looked for in a circuit
+MAX_BLOCK_PERIOD = 64
+
+# CX of neighbouring qubits (i, i + 1), by whether the control is qubit i
+NEIGHBOUR_CX = {
+    True: np.eye(4)[[0, 1, 3, 2]],
+    False: np.eye(4)[[0, 3, 2, 1]],
+}
+
 # custom types
+PARAMETER_BINDS = dict[Parameter, float]
 GATE_DICT = dict[int, str] | dict[tuple[int, int], str]
 VIRTUAL_ZS = dict[int, float]
 SINGLE_MOMENT = tuple[GATE_DICT, VIRTUAL_ZS]
@@ -33,61 +79,1001 @@ CIRCUIT_MOMENTS = list[tuple[GATE_DICT, VIRTUAL_ZS]]
 
 class Simulator:
     def __init__(
-        self, basis_gates: list[str], solver: qiskit_dynamics.Solver, backend: BackendV2
+        self,
+        basis_gates: list[str],
+        solver: qiskit_dynamics.Solver,
+        backend: BackendV2,
+        coupling_map: CouplingMap | None = None,
+        crosstalk_graph: list[tuple[int, int]] | None = None,
+        pack_moments: bool = False,
+        cache_size: int = 128,
+        integration: str | dict = "exact",
+        precision: str = "double",
     ):
+        # the coloring of the register decides which pulse colors are needed
+        # (a linear chain, the default coupling map, needs blue and red)
+        self._coupling_map = coupling_map
+        self._crosstalk_graph = crosstalk_graph
+        if coupling_map is None:
+            one_q_colors = ["blue", "red"]
+            two_q_colors = ["blue", "red"]
+        else:
+            one_q_coloring, two_q_coloring = pulse_coloring(
+                coupling_map.size(), coupling_map, crosstalk_graph
+            )
+            one_q_colors = sorted(set(one_q_coloring.values()))
+            two_q_colors = sorted(set(two_q_coloring.values()))
+
         required_pulses = []
         for gate in basis_gates:
             if gate in VIRTUAL_GATES:
                 continue
             elif gate in ONE_QUBIT_GATES:
-                required_pulses += [gate + "_blue", gate + "_red"]
+                required_pulses += [f"{gate}_{color}" for color in one_q_colors]
             elif gate in TWO_QUBIT_GATES:
                 continue
                 # ignored for now, should be able to add once we figure out 2q gates
                 required_pulses += [
-                    gate + "_control_blue",
-                    gate + "_control_red",
-                    gate + "_target_blue",
-                    gate + "_target_red",
+                    f"{gate}_{role}_{color}"
+                    for role in ["control", "target"]
+                    for color in two_q_colors
                 ]
         self._pulses = dict.fromkeys(required_pulses)
         self._dt = backend.configuration().dt * 1e9
         self._basis_gates = basis_gates
         self._solver = solver
+        self._integration = self._integration_options(integration)
+        self._segment_solver = None
+        self._segment_solves = {}
+        self._drift_split = None
+        self._local_model = None
+        self._chain_model = None
+        self._projected_chain_model = None
+        self._pulse_table = None
+        self._transmon_model = None
+        self._dtype = self._precision_dtype(precision)
 
         # set scheduler to not attach viertual gates since we sill extract
         # those from the label of the real gates and treat them accordingly
         self._scheduler = RobustScheduler(
             basis_gates=basis_gates,
-            coupling_map=None,
+            coupling_map=coupling_map,
             reattach=False,
             attach_final_virtual=False,
+            pack_moments=pack_moments,
+        )
+        # scheduler that will attach all virtual gates, for compiled circuits
+        self._compiled_scheduler = RobustScheduler(
+            basis_gates=basis_gates,
+            coupling_map=coupling_map,
+            pack_moments=pack_moments,
         )
 
+        # the scheduler and the solver keep state while running, so jobs from
+        # simulate_async take turns on them
+        self._compile_lock = threading.Lock()
+        self._solve_lock = threading.Lock()
+        self._in_flight = {}
+
+        # compiled moments by circuit structure and pulse propagators (without
+        # virtual zs) by moment, so that parameter sweeps skip both; jobs of
+        # simulate_async share them, so lookups and evictions are locked
+        self._moments_cache = OrderedDict()
+        self._propagator_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_size = cache_size
+
+        # local decay channels by (qubit, duration) for open-system simulation
+        self._decay_variables = None
+        self._decay_channels = {}
+        self._free_propagators = {}
+
     def set_pulse(self, name: str, pulse: qiskit.pulse.Waveform) -> None:
         if name not in self._pulses.keys():
             raise Exception(f"Pulse {name} not required for simulation.")
         self._pulses[name] = pulse
+        self._pulse_table = None
+        self._clear_propagators()
+
+    def set_pulses(self, pulses: dict[str, qiskit.pulse.Waveform]) -> None:
+        for name, pulse in pulses.items():
+            self.set_pulse(name, pulse)
+
+    def _clear_propagators(self) -> None:
+        with self._cache_lock:
+            self._propagator_cache.clear()
+
+    def set_integration(self, integration: str | dict) -> None:
+        """Set the solver options of the pulse moments.
+
+        Arguments:
+            integration: Name of one of the `INTEGRATION_PRESETS`, or a dict of
+                `qiskit_dynamics.Solver.solve` options with `max_dt` in samples.
+        """
+        self._integration = self._integration_options(integration)
+        self._clear_propagators()
+
+    def set_precision(self, precision: str) -> None:
+        """Set the precision, one of `PRECISIONS`, of propagators and states."""
+        self._dtype = self._precision_dtype(precision)
+        self._clear_propagators()
+
+    def set_local_model(
+        self, static_diagonal: np.ndarray, drives: dict[int, np.ndarray]
+    ) -> None:
+        """Set the Hamiltonian of the split operator integration.
+
+        Without a local model it is read off the solver. Setting it directly
+        avoids register operators altogether, e.g. with `rx_local_model` and
+        `crosstalk_model(..., diagonal=True)` for long chains.
+
+        Arguments:
+            static_diagonal: Diagonal of the static Hamiltonian.
+            drives: 2x2 drive operator by qubit.
+        """
+        self._local_model = (np.asarray(static_diagonal), dict(drives))
+        self._projected_chain_model = None
+        self._pulse_table = None
+        self._clear_propagators()
+
+    def set_chain_model(
+        self,
+        zz_strengths: dict[tuple[int, int], float],
+        drives: dict[int, np.ndarray],
+    ) -> None:
+        """Set the Hamiltonian of matrix product state simulations.
+
+        Without a chain model it is read off the local model. Setting it
+        directly avoids the diagonal of the register, e.g. with `zz_couplings`
+        of the chain edges and `rx_local_model` for 50+ qubits.
+
+        Arguments:
+            zz_strengths: Strength of the Z_i Z_i+1 crosstalk by edge (i, i+1).
+            drives: 2x2 drive operator by qubit.
+        """
+        if any(abs(i - j) != 1 for i, j in zz_strengths):
+            raise ValueError("Chain crosstalk must be between neighbouring qubits.")
+        self._chain_model = (dict(zz_strengths), dict(drives))
+
+    def set_transmon_model(
+        self,
+        static_diagonal: np.ndarray,
+        drives: dict[int, np.ndarray],
+        levels: int = 3,
+    ) -> None:
+        """Set the Hamiltonian of leakage simulations of transmons.
+
+        Arguments:
+            static_diagonal: Diagonal of the static Hamiltonian of length
+                levels^n, e.g. from `levels_diagonal` of the anharmonicities
+                and `transmon_crosstalk_diagonal`.
+            drives: Drive operator of shape (levels, levels) by qubit, e.g.
+                from `transmon_local_model`.
+            levels: Number of levels of each transmon.
+        """
+        self._transmon_model = (np.asarray(static_diagonal), dict(drives), levels)
+
+    def set_decay_model(self, variables: dict[str, float]) -> None:
+        """Use the T1 and T2 times in `variables` for open-system simulation."""
+        self._decay_variables = variables
+        self._decay_channels.clear()
 
     def get_compiled_circuit(self, circuit: QuantumCircuit) -> QuantumCircuit:
         circuit = RemoveBarriers()(circuit)
         # use scheduler that will attach all virtual gates
-        scheduler = RobustScheduler(basis_gates=self._basis_gates)
-        return scheduler.run(circuit)
+        with self._compile_lock:
+            return self._compiled_scheduler.run(circuit)
+
+    def simulate_circuit(
+        self,
+        circuit: QuantumCircuit,
+        repetitions: int = 1,
+        parameter_binds: PARAMETER_BINDS | None = None,
+        single_solve: bool = False,
+    ) -> Operator:
+        """Simulate the operator of a circuit.
+
+        With `single_solve` the pulse moments between two-qubit moments are
+        solved as one continuous schedule instead of moment by moment, see
+        `_solve_segment`. Propagators are not cached in this mode.
+        """
+        self._check_pulses()
+        if repetitions < 1:
+            raise ValueError(f"Repetitions must be positive, got {repetitions}.")
+
+        # get moments dicts from scheduler
+        moments = self._compile(circuit, parameter_binds)
+
+        # simulate each repeated block of moments once and exponentiate it
+        num_qubits = circuit.num_qubits
+        out = np.eye(2**num_qubits, dtype=self._dtype)
+        buffer = np.empty_like(out)
+        if single_solve:
+            if self._integration.get("method") in SPLIT_METHODS:
+                raise ValueError("Single solves need a qiskit-dynamics method.")
+            out = self._simulate_segments(moments, out, num_qubits)
+            out = out.astype(self._dtype, copy=False)
+            blocks = []
+        else:
+            blocks = self._find_repeated_blocks(moments)
+        for block, count in blocks:
+            op = self._simulate_moments(block, num_qubits)
+            if count > 1:
+                op = np.linalg.matrix_power(op, count)
+            np.matmul(op, out, out=buffer)
+            out, buffer = buffer, out
+
+        # the circuit is the declared block of a periodic circuit; the final
+        # virtual Zs are part of the block, so the frame carries over exactly
+        if repetitions > 1:
+            out = np.linalg.matrix_power(out, repetitions)
+
+        # moments are accumulated in the solver ordering (register 0 is the
+        # most significant qubit), convert to qiskit ordering only once
+        return Operator(out).reverse_qargs()
+
+    async def simulate_async(
+        self,
+        circuit: QuantumCircuit,
+        repetitions: int = 1,
+        parameter_binds: PARAMETER_BINDS | None = None,
+        timeout: float | None = None,
+        executor=None,
+    ) -> Operator:
+        """Simulate a circuit without blocking the event loop.
+
+        Compilation and solves run in `executor` (the default thread pool of
+        the loop if None). Identical requests in flight at the same time share
+        a single simulation. Cancelling a request, or exceeding `timeout`
+        seconds, only cancels the simulation once no other request waits on
+        it; a simulation that already started runs to completion in the
+        background.
+        """
+        loop = asyncio.get_running_loop()
+        key = (
+            loop,
+            circuit_key(circuit),
+            repetitions,
+            tuple(
+                sorted(
+                    (parameter_key(p), v) for p, v in (parameter_binds or {}).items()
+                )
+            ),
+            tuple(id(pulse) for pulse in self._pulses.values()),
+            # a job started before set_integration or set_precision keeps
+            # the settings it was started with
+            repr(sorted(self._integration.items())),
+            self._dtype,
+        )
+        if key not in self._in_flight:
+            job = loop.run_in_executor(
+                executor,
+                self.simulate_circuit,
+                circuit,
+                repetitions,
+                parameter_binds,
+            )
+            entry = [job, 0]
+            self._in_flight[key] = entry
+
+            def release(_, entry=entry):
+                if self._in_flight.get(key) is entry:
+                    del self._in_flight[key]
+
+            job.add_done_callback(release)
+        entry = self._in_flight[key]
+        job = entry[0]
+
+        entry[1] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(job), timeout)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not job.done():
+                job.cancel()
+
+    def estimate_fidelity(
+        self,
+        circuit: QuantumCircuit,
+        num_samples: int = 20,
+        confidence: float = 0.95,
+        process: bool = False,
+        seed: int | None = None,
+        parameter_binds: PARAMETER_BINDS | None = None,
+    ) -> tuple[float, tuple[float, float]]:
+        """Estimate the fidelity of the simulated circuit to the ideal circuit.
+
+        Haar random input states are propagated through the simulated moments
+        and through the ideal circuit, so neither process matrix is formed.
+        The mean state fidelity estimates the average gate fidelity; with
+        `process` it is converted to the process fidelity.
+
+        Returns:
+            The estimate and its normal-approximation confidence interval.
+        """
+        num_qubits = circuit.num_qubits
+        dim = 2**num_qubits
+        rng = np.random.default_rng(seed)
+        moments = self._compile(circuit, parameter_binds)
+        if parameter_binds:
+            circuit = circuit.assign_parameters(parameter_binds)
+
+        inputs = [random_statevector(dim, seed=rng) for _ in range(num_samples)]
+        expected = np.stack([psi.evolve(circuit).data for psi in inputs], axis=1)
+
+        # propagate all samples at once in the solver ordering
+        order = ps.qubit_reversal_permutation(num_qubits)
+        states = np.stack([psi.data for psi in inputs], axis=1)[order]
+        states = self._propagate_states(moments, states, num_qubits)[order]
+
+        samples = np.abs(np.sum(expected.conj() * states, axis=0)) ** 2
+        if process:
+            samples = ((dim + 1) * samples - 1) / dim
+        mean = np.mean(samples)
+        z = norm.ppf(0.5 + confidence / 2)
+        half_width = z * np.std(samples, ddof=1) / np.sqrt(num_samples)
+        return mean, (mean - half_width, mean + half_width)
+
+    def pulse_fidelity_function(self, gates: GATE_DICT, target: Operator):
+        """Differentiable fidelity of a pulse moment to a target unitary.
+
+        The moment is propagated sample by sample in JAX with the Hamiltonian
+        of the solver, over the same integration window as the simulation of
+        the moment.
+
+        Arguments:
+            gates: Pulse names of a one-qubit moment by qubit.
+            target: Target unitary of the whole register, in qiskit ordering.
+
+        Returns:
+            A jitted function from a dict of real pulse samples by pulse name
+            to the fidelity, ready for `jax.grad`. The samples must keep the
+            lengths of the pulses set on the simulator.
+        """
+        self._check_pulses()
+        model = self._solver.model
+        if model.rotating_frame.frame_operator is not None:
+            raise ValueError("Pulse fidelities need a solver without rotating frame.")
+        dt = self._dt
+        static_hamiltonian = np.asarray(model.static_operator)
+        operators = np.asarray(model.operators)
+        target = Operator(target).reverse_qargs().data
+
+        # the pulses play from the start of the integration window, which is
+        # then closed by free evolution
+        num_samples = max(self._pulses[name].duration for name in gates.values())
+        free_duration = self._moment_duration(gates) - num_samples * dt
+        channels = self._solver._hamiltonian_channels
+        channel_pulses = [
+            (channels.index(qiskit.pulse.DriveChannel(qubit).name), name)
+            for qubit, name in gates.items()
+        ]
+        free_propagator = ps.static_propagator(static_hamiltonian, free_duration)
+
+        def fidelity(samples):
+            coefficients = jnp.zeros((len(operators), num_samples))
+            for index, name in channel_pulses:
+                pulse = jnp.asarray(samples[name])
+                coefficients = coefficients.at[index, : len(pulse)].set(pulse)
+            propagator = ps.piecewise_constant_propagator(
+                static_hamiltonian, operators, coefficients, dt
+            )
+            return ps.unitary_fidelity(free_propagator @ propagator, target)
+
+        return jax.jit(fidelity)
+
+    def pulse_fidelity_grad(
+        self, gates: GATE_DICT, target: Operator
+    ) -> tuple[float, dict[str, np.ndarray]]:
+        """Fidelity of a pulse moment and its gradient by pulse sample.
+
+        See `pulse_fidelity_function`, evaluated at the pulses set on the
+        simulator.
+        """
+        fidelity = self.pulse_fidelity_function(gates, target)
+        samples = {
+            name: jnp.asarray(self._pulses[name].samples.real)
+            for name in set(gates.values())
+        }
+        value, grads = jax.value_and_grad(fidelity)(samples)
+        return float(value), {name: np.asarray(grad) for name, grad in grads.items()}
+
+    def run(
+        self,
+        circuit: QuantumCircuit,
+        shots: int = 1024,
+        seed: int | None = None,
+        parameter_binds: PARAMETER_BINDS | None = None,
+    ) -> Counts:
+        """Sample the final measurements of a circuit from the ground state.
+
+        The unmeasured circuit is propagated as a single state vector, so the
+        circuit operator is never formed. Mid-circuit measurements are not
+        supported.
+
+        Returns:
+            Counts of the classical registers, as from a qiskit backend.
+        """
+        self._check_pulses()
+        if shots < 1:
+            raise ValueError(f"Shots must be positive, got {shots}.")
+        unmeasured, measurements = self._split_final_measurements(circuit)
+        if not measurements:
+            raise ValueError("Circuit has no measurements.")
+
+        num_qubits = circuit.num_qubits
+        state = self._final_state(unmeasured, None, parameter_binds)
+        probabilities = np.abs(state) ** 2
+
+        # value of the classical register for each basis state in the solver
+        # ordering, where qubit q is bit n - 1 - q of the index
+        indices = np.arange(2**num_qubits)
+        values = np.zeros(2**num_qubits, dtype=int)
+        for qubit, clbit in measurements.items():
+            values |= ((indices >> (num_qubits - 1 - qubit)) & 1) << clbit
+
+        # marginalize onto the measured outcomes and sample all shots at once
+        outcomes, inverse = np.unique(values, return_inverse=True)
+        marginals = np.bincount(inverse, weights=probabilities)
+        rng = np.random.default_rng(seed)
+        samples = rng.multinomial(shots, marginals / np.sum(marginals))
+
+        counts = {
+            hex(outcome): int(count)
+            for outcome, count in zip(outcomes, samples)
+            if count > 0
+        }
+        return Counts(
+            counts,
+            creg_sizes=[[creg.name, creg.size] for creg in circuit.cregs],
+            memory_slots=circuit.num_clbits,
+        )
+
+    def expectation_values(
+        self,
+        circuit: QuantumCircuit,
+        observables: list[str | dict[int, str]],
+        initial_state: Statevector | None = None,
+        parameter_binds: PARAMETER_BINDS | None = None,
+    ) -> np.ndarray:
+        """Expectation values of product observables after a circuit.
+
+        Only the final state vector is computed, and each observable is
+        contracted one qubit at a time.
+
+        Arguments:
+            observables: Labels made by `to_label`, or dicts of `from_label`
+                characters by register.
+            initial_state: Defaults to the ground state.
+        """
+        self._check_pulses()
+        num_qubits = circuit.num_qubits
+        state = self._final_state(circuit, initial_state, parameter_binds)
+        return np.array(
+            [
+                ps.local_expectation(
+                    state, ps.local_operators(obs, num_qubits), num_qubits
+                ).real
+                for obs in observables
+            ]
+        )
+
+    def reduced_density_matrices(
+        self,
+        circuit: QuantumCircuit,
+        subsystems: list[list[int]],
+        initial_state: Statevector | None = None,
+        parameter_binds: PARAMETER_BINDS | None = None,
+    ) -> list[DensityMatrix]:
+        """Reduced density matrices of subsystems after a circuit.
+
+        Arguments:
+            subsystems: Qubits of each subsystem. Qubit k of a reduced density
+                matrix is the k-th listed qubit, as in qiskit `partial_trace`.
+            initial_state: Defaults to the ground state.
+        """
+        self._check_pulses()
+        num_qubits = circuit.num_qubits
+        state = self._final_state(circuit, initial_state, parameter_binds)
+        tensor = state.reshape((2,) * num_qubits)
+
+        matrices = []
+        for qubits in subsystems:
+            # the kept qubits become the leading axes, with the first listed
+            # qubit the least significant as in qiskit
+            kept = list(reversed(qubits))
+            amplitudes = np.moveaxis(tensor, kept, range(len(kept)))
+            amplitudes = amplitudes.reshape(2 ** len(kept), -1)
+            matrices.append(DensityMatrix(amplitudes @ amplitudes.conj().T))
+        return matrices
+
+    def _final_state(
+        self,
+        circuit: QuantumCircuit,
+        initial_state: Statevector | None,
+        parameter_binds: PARAMETER_BINDS | None,
+        solve=None,
+    ) -> np.ndarray:
+        # final state vector of the circuit in the solver ordering
+        num_qubits = circuit.num_qubits
+        moments = self._compile(circuit, parameter_binds)
+        if initial_state is None:
+            state = np.zeros(2**num_qubits, dtype=self._dtype)
+            state[0] = 1.0
+        else:
+            order = ps.qubit_reversal_permutation(num_qubits)
+            state = Statevector(initial_state).data[order].astype(self._dtype)
+        states = self._propagate_states(moments, state[:, None], num_qubits, solve)
+        return states[:, 0]
+
+    def split_error_estimate(
+        self,
+        circuit: QuantumCircuit,
+        initial_state: Statevector | None = None,
+        parameter_binds: PARAMETER_BINDS | None = None,
+    ) -> float:
+        """Estimate the error of the final state of the split operator method.
+
+        The final state is also computed with twice the substeps, and the
+        difference is extrapolated by the splitting order (Richardson).
+
+        Returns:
+            Estimated norm of the error of the final state.
+        """
+        if self._integration.get("method") != "split_operator":
+            raise ValueError("Error estimates need a split operator integration.")
+        order = self._integration.get("order", 2)
+        substeps = self._integration.get("substeps", 1)
+        refined_solve = functools.partial(
+            self._solve_pulses_local, substeps=2 * substeps
+        )
+        state = self._final_state(circuit, initial_state, parameter_binds)
+        refined = self._final_state(
+            circuit, initial_state, parameter_binds, solve=refined_solve
+        )
+        return float(np.linalg.norm(state - refined) / (1 - 2.0**-order))
+
+    def simulate_mps(
+        self,
+        circuit: QuantumCircuit,
+        observables: list[str | dict[int, str]],
+        max_bond: int | None = 64,
+        cutoff: float = 1e-12,
+        parameter_binds: PARAMETER_BINDS | None = None,
+    ) -> tuple[np.ndarray, float]:
+        """Expectation values of product observables on a 1D chain, using a
+        matrix product state (TEBD).
+
+        Pulse moments take a Strang step per sample, as the "split2" preset,
+        with the crosstalk of the chain edges as two-qubit phase gates. Two
+        qubit gates must act on neighbouring qubits.
+
+        Arguments:
+            observables: Labels made by `to_label`, or dicts of `from_label`
+                characters by register.
+            max_bond: Largest bond dimension kept, None for no limit.
+            cutoff: Largest discarded weight of a bond truncation.
+
+        Returns:
+            Expectation values, and the summed discarded weight of all
+            truncations, which bounds the infidelity of the final state to
+            first order.
+        """
+        self._check_pulses()
+        num_qubits = circuit.num_qubits
+        moments = self._compile(circuit, parameter_binds)
+        mps = ps.MatrixProductState(num_qubits, max_bond=max_bond, cutoff=cutoff)
+        for gates, virtual_zs, n_qubits in moments:
+            for qubit, angle in virtual_zs.items():
+                mps.apply_one_qubit(
+                    np.diag(ps.rz_diagonal({qubit: angle}, [qubit])), qubit
+                )
+            if n_qubits == 1:
+                self._solve_pulses_mps(gates, mps)
+            elif n_qubits == 2:
+                for control, target in gates:
+                    if abs(control - target) != 1:
+                        raise ValueError(
+                            f"Gate on {(control, target)} is not on neighbouring qubits."
+                        )
+                    mps.apply_two_qubit(
+                        NEIGHBOUR_CX[control < target], min(control, target)
+                    )
+        values = np.array(
+            [
+                mps.expectation(ps.local_operators(obs, num_qubits)).real
+                for obs in observables
+            ]
+        )
+        return values, mps.truncation_error
+
+    def simulate_leakage(
+        self,
+        circuit: QuantumCircuit,
+        parameter_binds: PARAMETER_BINDS | None = None,
+        order: int = 4,
+        substeps: int = 4,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Simulate a circuit on transmons with more than two levels.
+
+        Pulse moments are split into the diagonal drift and the drive of each
+        transmon, as the "split_operator" method, so the cost is that of the
+        state vector instead of the dense levels^n x levels^n propagators.
+        CX gates are ideal on the qubit subspace and leave leaked transmons
+        alone. See `set_transmon_model`.
+
+        Arguments:
+            order: Order of the splitting, 2 or 4.
+            substeps: Splitting steps per sample. The anharmonicity is large
+                on the scale of a sample, so more than one step is needed.
+
+        Returns:
+            Final state vector in the levels basis, where register 0 is the
+            most significant, and the leaked population of each transmon.
+        """
+        if self._transmon_model is None:
+            raise ValueError("Leakage simulation needs a transmon model.")
+        self._check_pulses()
+        static_diagonal, drives, levels = self._transmon_model
+        num_qubits = circuit.num_qubits
+        registers = [i for i in range(num_qubits)]
+        moments = self._compile(circuit, parameter_binds)
+
+        state = np.zeros(levels**num_qubits, dtype=complex)
+        state[0] = 1.0
+        for gates, virtual_zs, n_qubits in moments:
+            # the frame change of a virtual z shifts the phase of every level
+            angles = {
+                qubit: angle * (np.arange(levels) - 0.5)
+                for qubit, angle in virtual_zs.items()
+            }
+            state = np.exp(1j * ps.levels_diagonal(angles, registers, levels)) * state
+            if n_qubits == 1 and gates:
+                coefficients = {
+                    qubit: self._pulses[name].samples.real
+                    for qubit, name in gates.items()
+                }
+                state = ps.split_operator_propagate(
+                    static_diagonal,
+                    drives,
+                    coefficients,
+                    self._dt,
+                    state,
+                    duration=self._moment_duration(gates),
+                    order=order,
+                    substeps=substeps,
+                    levels=levels,
+                )
+            elif n_qubits == 2:
+                state = state[self._levels_cx_permutation(gates, num_qubits, levels)]
+        return state, ps.leakage_populations(state, num_qubits, levels)
+
+    def _split_final_measurements(
+        self, circuit: QuantumCircuit
+    ) -> tuple[QuantumCircuit, dict[int, int]]:
+        # copy the circuit without classical bits, recording which clbit each
+        # measured qubit is written to
+        unmeasured = QuantumCircuit(*circuit.qregs, global_phase=circuit.global_phase)
+        measurements = {}
+        for instruction in circuit.data:
+            qubits = [circuit.find_bit(q).index for q in instruction.qubits]
+            if instruction.operation.name == "measure":
+                clbit = circuit.find_bit(instruction.clbits[0]).index
+                measurements[qubits[0]] = clbit
+                continue
+            if instruction.operation.name == "barrier":
+                unmeasured.append(instruction.operation, instruction.qubits)
+                continue
+            if instruction.clbits or any(q in measurements for q in qubits):
+                raise ValueError(
+                    f"Mid-circuit measurements are not supported, found "
+                    f"{instruction.operation.name} after a measurement."
+                )
+            unmeasured.append(instruction.operation, instruction.qubits)
+        return unmeasured, measurements
+
+    def simulate_density_matrix(
+        self,
+        circuit: QuantumCircuit,
+        initial_state: Statevector | DensityMatrix | None = None,
+        parameter_binds: PARAMETER_BINDS | None = None,
+    ) -> DensityMatrix:
+        """Simulate a circuit with the qubit decay model attached.
+
+        The pulses of a moment only fill the start of its integration window,
+        see `_split_moment`. Their propagator is applied between two halves
+        of the local T1/T2 decay channels of the pulse window (Strang
+        splitting), and the free evolution of the rest of the window is
+        followed by its decay. The drift is diagonal, so this second step is
+        exact for the local drift and for dephasing; ZZ crosstalk and
+        damping only fail to commute at the order of the ZZ phase times the
+        decay. The dissipators of `qubit_decay_model` act on single qubits
+        and commute with each other, so the decay is a product of cached 4x4
+        channels and no 4^n superoperator is formed. Two-qubit moments are
+        still ideal and instantaneous, so they do not decay.
+        """
+        self._check_pulses()
+        if self._decay_variables is None:
+            raise Exception("Decay model not set, use set_decay_model.")
+
+        num_qubits = circuit.num_qubits
+        registers = [i for i in range(num_qubits)]
+        moments = self._compile(circuit, parameter_binds)
+
+        # density matrix in the solver ordering
+        order = ps.qubit_reversal_permutation(num_qubits)
+        if initial_state is None:
+            rho = np.zeros((2**num_qubits, 2**num_qubits), dtype=complex)
+            rho[0, 0] = 1.0
+        else:
+            rho = DensityMatrix(initial_state).data[np.ix_(order, order)]
+
+        for gates, virtual_zs, n_qubits in moments:
+            if n_qubits == 1:
+                pulse_op, free_op, pulse_duration, free_duration = self._split_moment(
+                    gates, virtual_zs, num_qubits
+                )
+                rho = self._apply_decay(rho, pulse_duration / 2, num_qubits)
+                rho = pulse_op @ rho @ pulse_op.conj().T
+                rho = self._apply_decay(rho, pulse_duration / 2, num_qubits)
+                rho = free_op @ rho @ free_op.conj().T
+                rho = self._apply_decay(rho, free_duration, num_qubits)
+            elif n_qubits == 2:
+                rzs = ps.rz_diagonal(virtual_zs, registers)
+                rho = rzs[:, None] * rho * rzs.conj()[None, :]
+                permutation = self._cx_permutation(gates, num_qubits)
+                rho = rho[np.ix_(permutation, permutation)]
+
+        return DensityMatrix(rho[np.ix_(order, order)])
+
+    def simulate_trajectories(
+        self,
+        circuit: QuantumCircuit,
+        observables: list[str | dict[int, str]],
+        num_trajectories: int = 100,
+        initial_state: Statevector | None = None,
+        seed: int | None = None,
+        parameter_binds: PARAMETER_BINDS | None = None,
+    ) -> list[tuple[float, float]]:
+        """Estimate observables under the qubit decay model with trajectories.
+
+        The decay channels of `simulate_density_matrix` are unraveled into
+        random jumps of their Kraus operators, so each trajectory is a state
+        vector and all trajectories are propagated together as one batch by
+        the cached propagators of the moments.
+
+        Arguments:
+            observables: Product observables as labels made by `to_label`, or
+                as dicts of `from_label` characters by register.
+
+        Returns:
+            The mean and the standard error of each observable.
+        """
+        self._check_pulses()
+        if self._decay_variables is None:
+            raise Exception("Decay model not set, use set_decay_model.")
+
+        num_qubits = circuit.num_qubits
+        registers = [i for i in range(num_qubits)]
+        rng = np.random.default_rng(seed)
+        moments = self._compile(circuit, parameter_binds)
+        operators = [ps.local_operators(obs, num_qubits) for obs in observables]
+
+        # trajectories as columns in the solver ordering
+        order = ps.qubit_reversal_permutation(num_qubits)
+        if initial_state is None:
+            initial_state = Statevector.from_int(0, 2**num_qubits)
+        state = Statevector(initial_state).data[order]
+        states = np.repeat(state[:, None], num_trajectories, axis=1)
+
+        for gates, virtual_zs, n_qubits in moments:
+            if n_qubits == 1:
+                pulse_op, free_op, pulse_duration, free_duration = self._split_moment(
+                    gates, virtual_zs, num_qubits
+                )
+                states = self._jump_decay(states, pulse_duration / 2, num_qubits, rng)
+                states = pulse_op @ states
+                states = self._jump_decay(states, pulse_duration / 2, num_qubits, rng)
+                states = free_op @ states
+                states = self._jump_decay(states, free_duration, num_qubits, rng)
+            elif n_qubits == 2:
+                states = ps.rz_diagonal(virtual_zs, registers)[:, None] * states
+                states = states[self._cx_permutation(gates, num_qubits)]
+
+        results = []
+        for factors in operators:
+            samples = ps.local_expectation(states, factors, num_qubits).real
+            stderr = np.std(samples, ddof=1) / np.sqrt(num_trajectories)
+            results.append((np.mean(samples), stderr))
+        return results
+
+    def _split_moment(
+        self, gates: GATE_DICT, virtual_zs: VIRTUAL_ZS, num_qubits: int
+    ) -> tuple[np.ndarray, np.ndarray, float, float]:
+        # the pulses play for num_samples * dt from the start of the window of
+        # num_samples, the rest is free evolution; the cached propagator of
+        # the whole window is split as free_op @ pulse_op
+        window = self._moment_duration(gates)
+        pulse_duration = min(window * self._dt, window)
+        free_duration = window - pulse_duration
+        op = self._simulate_one_qubit_moment(gates, virtual_zs, num_qubits)
+        if free_duration == 0:
+            return op, np.eye(2**num_qubits), pulse_duration, 0.0
+        free_op = self._free_propagator(pulse_duration, window, num_qubits)
+        return free_op.conj().T @ op, free_op, pulse_duration, free_duration
+
+    def _free_propagator(self, start: float, stop: float, num_qubits: int):
+        key = (num_qubits, start, stop)
+        if key not in self._free_propagators:
+            solver = self._solver
+            signals = [
+                qiskit_dynamics.Signal(0.0, carrier_freq=0.0)
+                for _ in solver._hamiltonian_channels
+            ]
+            with self._solve_lock:
+                sol = solver.solve(
+                    t_span=[start, stop],
+                    y0=np.eye(2**num_qubits, dtype=complex),
+                    signals=signals,
+                    atol=1e-12,
+                    rtol=1e-12,
+                )
+            self._free_propagators[key] = np.array(sol.y[-1])
+        return self._free_propagators[key]
+
+    def _jump_decay(
+        self,
+        states: np.ndarray,
+        duration: float,
+        num_qubits: int,
+        rng: np.random.Generator,
+    ) -> np.ndarray:
+        if duration == 0:
+            return states
+        for qubit in range(num_qubits):
+            kraus_ops = ps.kraus_operators(self._decay_channel(qubit, duration))
+            states = ps.sample_local_kraus(states, kraus_ops, qubit, num_qubits, rng)
+        return states
+
+    def _decay_channel(self, qubit: int, duration: float) -> np.ndarray:
+        key = (qubit, duration)
+        if key not in self._decay_channels:
+            jump_ops = ps.qubit_decay_model(qubit, [qubit], self._decay_variables)
+            self._decay_channels[key] = ps.dissipator_channel(jump_ops, duration)
+        return self._decay_channels[key]
+
+    def _apply_decay(
+        self, rho: np.ndarray, duration: float, num_qubits: int
+    ) -> np.ndarray:
+        if duration == 0:
+            return rho
+        for qubit in range(num_qubits):
+            channel = self._decay_channel(qubit, duration)
+            rho = ps.apply_local_superoperator(rho, channel, qubit, num_qubits)
+        return rho
+
+    def _moment_duration(self, gates: GATE_DICT) -> int:
+        # pulses of a moment start together, the solver integrates to the end
+        # of the longest one
+        return max([self._pulses[name].duration for name in gates.values()] + [0])
 
-    def simulate_circuit(self, circuit: QuantumCircuit) -> DensityMatrix:
+    def _check_pulses(self) -> None:
         # check that all pulses are loaded correctly
         pulses = self._pulses
         for gate_name in pulses:
             if pulses[gate_name] is None:
                 raise Exception(f"Pulse {gate_name} not loaded.")
 
-        # get moments dicts from scheduler
-        moments = self._get_moments(circuit=circuit)
+    def precision_report(
+        self,
+        circuit: QuantumCircuit,
+        parameter_binds: PARAMETER_BINDS | None = None,
+    ) -> dict[str, float]:
+        """Compare the configured precision to double precision on a circuit.
 
-        # simulate each moment
+        Returns:
+            The largest entry of U†U - I for the simulated operator, and the
+            infidelity between it and an uncached double precision operator.
+        """
+        self._check_pulses()
         num_qubits = circuit.num_qubits
-        out = Operator(QuantumCircuit(num_qubits))
+        dim = 2**num_qubits
+        registers = [i for i in range(num_qubits)]
+        moments = self._compile(circuit, parameter_binds)
+        out = self.simulate_circuit(circuit, parameter_binds=parameter_binds)
+        out = out.reverse_qargs().data
+
+        # solver ordering reference that skips the propagator cache
+        reference = np.eye(dim, dtype=complex)
+        for gates, virtual_zs, n_qubits in moments:
+            rzs = np.diag(ps.rz_diagonal(virtual_zs, registers))
+            if n_qubits == 1:
+                op = self._solve_pulses(gates, rzs)
+            elif n_qubits == 2:
+                op = self._simulate_two_qubit_moment(gates, {}, num_qubits) @ rzs
+            reference = op @ reference
+
+        unitarity = out.conj().T @ out - np.eye(dim)
+        overlap = np.trace(reference.conj().T @ out.astype(complex)) / dim
+        return {
+            "unitarity_error": float(np.max(np.abs(unitarity))),
+            "fidelity_drift": float(abs(1 - np.abs(overlap) ** 2)),
+        }
+
+    def _precision_dtype(self, precision: str) -> type:
+        if precision not in PRECISIONS:
+            raise ValueError(
+                f"Unknown precision {precision}, choose from {', '.join(PRECISIONS)}."
+            )
+        return PRECISIONS[precision]
+
+    def _integration_options(self, integration: str | dict) -> dict:
+        if isinstance(integration, str):
+            if integration not in INTEGRATION_PRESETS:
+                raise ValueError(
+                    f"Unknown integration preset {integration}, choose from "
+                    f"{', '.join(INTEGRATION_PRESETS)}."
+                )
+            return dict(INTEGRATION_PRESETS[integration])
+        return dict(integration)
+
+    def _compile(
+        self, circuit: QuantumCircuit, parameter_binds: PARAMETER_BINDS | None
+    ) -> CIRCUIT_MOMENTS:
+        # the moments only depend on the structure of the circuit, unbound
+        # parameters are kept as expressions in the virtual zs
+        cache = self._moments_cache
+        key = circuit_key(circuit)
+        with self._compile_lock:
+            moments = cache.get(key)
+            if moments is not None:
+                cache.move_to_end(key)
+            else:
+                moments = self._get_moments(circuit=circuit)
+                cache[key] = moments
+                if len(cache) > self._cache_size:
+                    cache.popitem(last=False)
+
+        # bind into fresh dicts so the cached moments are never modified
+        parameter_binds = parameter_binds or {}
+        bound_moments = []
+        for gates, virtual_zs, n_qubits in moments:
+            bound_zs = {}
+            for qubit, angle in virtual_zs.items():
+                if isinstance(angle, ParameterExpression):
+                    angle = angle.bind(parameter_binds, allow_unknown_parameters=True)
+                    if angle.parameters:
+                        names = ", ".join(sorted(map(str, angle.parameters)))
+                        raise ValueError(f"Unbound parameters {names}.")
+                    angle = float(angle)
+                bound_zs[qubit] = angle
+            bound_moments.append((dict(gates), bound_zs, n_qubits))
+        return bound_moments
+
+    def _propagate_states(
+        self,
+        moments: CIRCUIT_MOMENTS,
+        states: np.ndarray,
+        num_qubits: int,
+        solve=None,
+    ) -> np.ndarray:
+        registers = [i for i in range(num_qubits)]
+        dtype = self._dtype
+        solve = solve or self._solve_pulses
+        for gates, virtual_zs, n_qubits in moments:
+            rzs = ps.rz_diagonal(virtual_zs, registers).astype(dtype)
+            states = rzs[:, None] * states
+            if n_qubits == 1:
+                states = solve(gates, states).astype(dtype, copy=False)
+            elif n_qubits == 2:
+                states = states[self._cx_permutation(gates, num_qubits)]
+        return states
+
+    def _simulate_moments(
+        self, moments: CIRCUIT_MOMENTS, num_qubits: int
+    ) -> np.ndarray:
+        out = np.eye(2**num_qubits, dtype=self._dtype)
+        buffer = np.empty_like(out)
         for moment in moments:
             gates = moment[0]
             virtual_zs = moment[1]
@@ -96,25 +1082,218 @@ class Simulator:
                 op = self._simulate_one_qubit_moment(gates, virtual_zs, num_qubits)
             if n_qubits == 2:
                 op = self._simulate_two_qubit_moment(gates, virtual_zs, num_qubits)
-            # print("\n")
-            # print(moment)
-            # print(op)
-            out = op @ out
-
-        # testing
-        # a = RobustScheduler(
-        #     basis_gates=self._basis_gates,
-        #     coupling_map=None,
-        #     reattach=True,
-        #     attach_final_virtual=True,
-        # )
-        # print("\n", Operator(a.run(circuit)).data)
-
+            np.matmul(op, out, out=buffer)
+            out, buffer = buffer, out
         return out
 
+    def _simulate_segments(
+        self, moments: CIRCUIT_MOMENTS, y0: np.ndarray, num_qubits: int
+    ) -> np.ndarray:
+        # solve the runs of pulse moments between the ideal two-qubit moments
+        out = y0
+        segment = []
+        for moment in moments:
+            gates, virtual_zs, n_qubits = moment
+            if n_qubits == 2:
+                out = self._solve_segment(segment, out, num_qubits)
+                segment = []
+                op = self._simulate_two_qubit_moment(gates, virtual_zs, num_qubits)
+                out = op @ out
+            else:
+                segment.append(moment)
+        return self._solve_segment(segment, out, num_qubits)
+
+    def _solve_segment(
+        self, moments: CIRCUIT_MOMENTS, y0: np.ndarray, num_qubits: int
+    ) -> np.ndarray:
+        """Solve consecutive pulse moments as one schedule.
+
+        The virtual Zs before a pulse are moved to the end of the segment,
+        which turns the drive H_q of each later pulse into
+        Rz(φ)† H_q Rz(φ) = cos(φ) H_q + sin(φ) Q_q for the accumulated frame φ
+        of its qubit. The quadrature Q_q = Rz(π/2)† H_q Rz(π/2) gets its own
+        operator in the segment solver. Each moment keeps its integration
+        window of the moment by moment path, padded with zero samples.
+        """
+        if not moments:
+            return y0
+        dt = self._dt
+        registers = [i for i in range(num_qubits)]
+        solver, channel_qubits = self._get_segment_solver()
+
+        # samples of every drive over the whole segment in the frame of the
+        # accumulated virtual zs
+        spans = []
+        for gates, _, _ in moments:
+            span = self._moment_duration(gates) / dt
+            if not np.isclose(span, round(span)):
+                raise ValueError("Moment durations must be whole multiples of dt.")
+            spans.append(round(span))
+        in_phase = np.zeros((len(channel_qubits), sum(spans)), dtype=complex)
+        quadrature = np.zeros_like(in_phase)
+        frames = dict.fromkeys(registers, 0.0)
+        offset = 0
+        for (gates, virtual_zs, _), span in zip(moments, spans):
+            for qubit, angle in virtual_zs.items():
+                frames[qubit] += angle
+            for index, qubit in enumerate(channel_qubits):
+                if qubit in gates:
+                    samples = self._pulses[gates[qubit]].samples
+                    end = offset + len(samples)
+                    in_phase[index, offset:end] = np.cos(frames[qubit]) * samples
+                    quadrature[index, offset:end] = np.sin(frames[qubit]) * samples
+            offset += span
+
+        rzs = ps.rz_diagonal(frames, registers)
+        if offset == 0:
+            return rzs[:, None] * y0
+        solve = self._get_segment_solve(offset)
+        with self._solve_lock:
+            out = solve(
+                np.concatenate([in_phase, quadrature]), y0.astype(complex, copy=False)
+            )
+        return rzs[:, None] * np.array(out)
+
+    def _get_segment_solve(self, num_samples: int):
+        # the solve of a segment only depends on its length and the solver
+        # options, so the JAX methods are compiled once per segment length
+        options = dict(self._integration)
+        key = (num_samples, tuple(sorted(options.items())))
+        if key not in self._segment_solves:
+            solver, _ = self._get_segment_solver()
+            dt = self._dt
+            duration = num_samples * dt
+            if "max_dt" in options:
+                options["max_dt"] = options["max_dt"] * dt
+
+            def solve(samples, y0):
+                signals = [
+                    qiskit_dynamics.signals.DiscreteSignal(
+                        dt=dt, samples=qiskit_dynamics.array.Array(channel_samples)
+                    )
+                    for channel_samples in samples
+                ]
+                sol = solver.solve(
+                    t_span=[0.0, duration],
+                    y0=y0,
+                    signals=signals,
+                    t_eval=[0.0, duration],
+                    **options,
+                )
+                return qiskit_dynamics.array.Array(sol.y[-1]).data
+
+            if options.get("method", "").startswith("jax"):
+                solve = jax.jit(solve)
+            self._segment_solves[key] = solve
+        return self._segment_solves[key]
+
+    def _get_segment_solver(self) -> tuple[qiskit_dynamics.Solver, list[int]]:
+        if self._segment_solver is None:
+            model = self._solver.model
+            if model.rotating_frame.frame_operator is not None:
+                raise ValueError("Single solves need a solver without rotating frame.")
+
+            # drive operators of the one-qubit pulses and their quadratures
+            channel_qubits = []
+            drives = []
+            quadratures = []
+            operators = np.asarray(model.operators)
+            num_qubits = int(np.log2(operators.shape[-1]))
+            for channel, operator in zip(self._solver._hamiltonian_channels, operators):
+                qubit = int(channel[1:])
+                if channel != qiskit.pulse.DriveChannel(qubit).name:
+                    continue
+                rz = ps.rz_diagonal({qubit: np.pi / 2}, range(num_qubits))
+                channel_qubits.append(qubit)
+                drives.append(operator)
+                quadratures.append(rz.conj()[:, None] * operator * rz[None, :])
+
+            solver = qiskit_dynamics.Solver(
+                static_hamiltonian=np.asarray(model.static_operator),
+                hamiltonian_operators=np.array(drives + quadratures),
+            )
+            self._segment_solver = (solver, channel_qubits)
+        return self._segment_solver
+
+    def _find_repeated_blocks(
+        self, moments: CIRCUIT_MOMENTS
+    ) -> list[tuple[CIRCUIT_MOMENTS, int]]:
+        """Split the moments into blocks that repeat back-to-back.
+
+        Each entry is a block of moments and its number of consecutive
+        repetitions. At every position, the period up to `MAX_BLOCK_PERIOD`
+        that removes the most moment simulations is chosen (smallest period
+        on ties).
+        """
+        # compare moments by integer ids, and for each period count how many
+        # moments from each position on equal the moment one period later
+        ids = {}
+        sequence = np.array(
+            [
+                ids.setdefault(
+                    (
+                        frozenset(gates.items()),
+                        frozenset(virtual_zs.items()),
+                        n_qubits,
+                    ),
+                    len(ids),
+                )
+                for gates, virtual_zs, n_qubits in moments
+            ],
+            dtype=int,
+        )
+        n_moments = len(moments)
+        matches = {}
+        for period in range(1, min(MAX_BLOCK_PERIOD, n_moments // 2) + 1):
+            equal = sequence[:-period] == sequence[period:]
+            positions = np.arange(len(equal))
+            stops = np.where(equal, len(equal), positions)
+            matches[period] = np.minimum.accumulate(stops[::-1])[::-1] - positions
+
+        blocks = []
+        i = 0
+        while i < n_moments:
+            best_period, best_count = 1, 1
+            for period in range(1, min(MAX_BLOCK_PERIOD, (n_moments - i) // 2) + 1):
+                count = 1 + matches[period][i] // period
+                if (count - 1) * period > (best_count - 1) * best_period:
+                    best_period, best_count = period, count
+            blocks.append((moments[i : i + best_period], best_count))
+            i += best_period * best_count
+        return blocks
+
     def _simulate_one_qubit_moment(
         self, gates: GATE_DICT, virtual_zs: VIRTUAL_ZS, num_qubits: int
-    ) -> Operator:
+    ) -> np.ndarray:
+        cache = self._propagator_cache
+        key = (num_qubits, frozenset(gates.items()))
+        # other jobs may evict the key at any time, so only the local
+        # reference to the propagator is used after the lookup
+        with self._cache_lock:
+            op = cache.get(key)
+            if op is not None:
+                cache.move_to_end(key)
+        if op is None:
+            op = self._solve_pulses(gates, np.eye(2**num_qubits, dtype=complex))
+            op = op.astype(self._dtype)
+            with self._cache_lock:
+                cache[key] = op
+                if len(cache) > self._cache_size:
+                    cache.popitem(last=False)
+
+        # virtual zs act before the pulses, i.e. op @ diag(rzs)
+        rzs = ps.rz_diagonal(virtual_zs, [i for i in range(num_qubits)])
+        return op * rzs.astype(self._dtype)
+
+    def _solve_pulses(self, gates: GATE_DICT, y0: np.ndarray) -> np.ndarray:
+        if not gates:
+            return y0.copy()
+        if self._integration.get("method") == "diagonal_drift":
+            return self._solve_pulses_split(gates, y0)
+        if self._integration.get("method") == "split_operator":
+            return self._solve_pulses_local(gates, y0)
+        if self._integration.get("method") == "propagator_table":
+            return self._solve_pulses_table(gates, y0)
         solver = self._solver
         dt = self._dt
         pulses = self._pulses
@@ -127,46 +1306,279 @@ class Simulator:
         # pulse_moment.draw()
         # plt.show()
 
-        U0 = ps.qiskit_identity_operator(num_qubits)
+        # the solver works in double precision whatever the simulator precision
+        y0 = y0.astype(complex, copy=False)
+
+        # only the final state is kept, so the fixed-step methods are free to
+        # take steps of max_dt across the whole moment
+        options = dict(self._integration)
+        if "max_dt" in options:
+            options["max_dt"] = options["max_dt"] * dt
+
         duration = pulse_moment.duration
-        sol = solver.solve(
-            t_span=[0.0, duration],
-            y0=U0,
-            signals=pulse_moment,
-            max_dt=dt,
-            t_eval=np.linspace(0, duration, int(duration / dt) + 1, endpoint=True),
-            method="jax_expm",
-            magnus_order=1,
+        with self._solve_lock:
+            sol = solver.solve(
+                t_span=[0.0, duration],
+                y0=y0,
+                signals=pulse_moment,
+                t_eval=[0.0, duration],
+                **options,
+            )
+        return np.array(sol.y[-1])
+
+    def _solve_pulses_split(self, gates: GATE_DICT, y0: np.ndarray) -> np.ndarray:
+        # the drift is applied as phases and the drives, which commute, in
+        # their common eigenbasis; see `diagonal_drift_propagate`
+        static_diagonal, eigenbasis, eigenvalues = self._get_drift_split()
+        dt = self._dt
+        channels = self._solver._hamiltonian_channels
+        num_samples = max(self._pulses[name].duration for name in gates.values())
+        coefficients = np.zeros((len(channels), num_samples))
+        for qubit, name in gates.items():
+            index = channels.index(qiskit.pulse.DriveChannel(qubit).name)
+            samples = self._pulses[name].samples
+            coefficients[index, : len(samples)] = samples.real
+        return ps.diagonal_drift_propagate(
+            static_diagonal,
+            eigenbasis,
+            eigenvalues,
+            coefficients,
+            dt,
+            y0.astype(complex, copy=False),
+            duration=self._moment_duration(gates),
         )
-        op = sol.y[-1]
 
-        # TODO: handle z gates correctly
-        for i in range(num_qubits):
-            if i not in virtual_zs:
-                virtual_zs[i] = 0.0
-        rzs = ps.rz_moment(virtual_zs, [i for i in range(num_qubits)])
-        rzs = rzs.reverse_qargs()
+    def _solve_pulses_local(
+        self, gates: GATE_DICT, y0: np.ndarray, substeps: int | None = None
+    ) -> np.ndarray:
+        # one-qubit rotations and crosstalk phases, see `split_operator_propagate`
+        static_diagonal, drives = self._get_local_model()
+        coefficients = {
+            qubit: self._pulses[name].samples.real for qubit, name in gates.items()
+        }
+        return ps.split_operator_propagate(
+            static_diagonal,
+            drives,
+            coefficients,
+            self._dt,
+            y0.astype(complex, copy=False),
+            duration=self._moment_duration(gates),
+            order=self._integration.get("order", 2),
+            substeps=substeps or self._integration.get("substeps", 1),
+        )
 
-        return (op @ rzs).reverse_qargs()
+    def _solve_pulses_table(self, gates: GATE_DICT, y0: np.ndarray) -> np.ndarray:
+        # table lookups of the one-qubit propagators and of the crosstalk
+        # corrections of the edges, see `table_moment_propagate`
+        static_diagonal, _ = self._get_local_model()
+        table, corrections, edges, pulse_index, constant, fields = (
+            self._get_pulse_table()
+        )
+        idle = len(pulse_index)
+        index = [pulse_index.get(gates.get(q), idle) for q in range(len(fields))]
+        rotations = {
+            qubit: table[qubit, index[qubit]]
+            for qubit in range(len(fields))
+            if qubit in gates or fields[qubit] != 0
+        }
+        edge_corrections = {
+            (i1, i2): corrections[k, index[i1], index[i2]]
+            for k, (i1, i2) in enumerate(edges)
+        }
+        window = self._pulse_table_window() * self._dt
+        free_duration = self._moment_duration(gates) - window
+        if free_duration < 0:
+            raise ValueError("Moment is shorter than the longest pulse.")
+        y = ps.table_moment_propagate(
+            rotations,
+            edge_corrections,
+            static_diagonal,
+            free_duration,
+            y0.astype(complex, copy=False),
+        )
+        # the constant of the drift is a global phase over the pulses
+        return np.exp(-1j * constant * window) * y
+
+    def _pulse_table_window(self) -> int:
+        # tabulated pulses are padded to the longest one
+        return max(pulse.duration for pulse in self._pulses.values())
+
+    def _get_pulse_table(self) -> tuple:
+        # built once for all pulses after they are set, and again whenever a
+        # pulse or the local model changes
+        if self._pulse_table is None:
+            self._check_pulses()
+            static_diagonal, drives = self._get_local_model()
+            constant, fields, couplings = ps.pauli_z_decomposition(static_diagonal)
+            names = list(self._pulses)
+            table, corrections = ps.pulse_propagator_table(
+                fields,
+                couplings,
+                drives,
+                [self._pulses[name].samples.real for name in names],
+                self._dt,
+            )
+            pulse_index = {name: j for j, name in enumerate(names)}
+            self._pulse_table = (
+                table,
+                corrections,
+                list(couplings),
+                pulse_index,
+                constant,
+                fields,
+            )
+        return self._pulse_table
+
+    def _solve_pulses_mps(self, gates: GATE_DICT, mps: ps.MatrixProductState) -> None:
+        # one Strang step per sample as in `split_operator_propagate`, the
+        # half steps of crosstalk of neighbouring samples are merged
+        zz_strengths, drives = self._get_chain_model()
+        dt = self._dt
+        samples = {
+            qubit: self._pulses[name].samples.real for qubit, name in gates.items()
+        }
+        num_steps = max([len(s) for s in samples.values()] + [0])
+        free_duration = self._moment_duration(gates) - num_steps * dt
+        eigensystems = {qubit: np.linalg.eigh(drives[qubit]) for qubit in samples}
+        signs = np.array([1.0, -1.0, -1.0, 1.0])
+
+        def crosstalk_layer(duration, sweep):
+            # the phase gates commute, so the sweeps alternate direction to
+            # save moving the canonical center
+            edges = sorted(zz_strengths, reverse=sweep % 2 == 1)
+            for i, j in edges:
+                if zz_strengths[(i, j)] == 0:
+                    continue
+                phases = np.exp(-1j * duration * zz_strengths[(i, j)] * signs)
+                mps.apply_diagonal_two_qubit(phases, min(i, j), sweep % 2 == 0)
+
+        durations = [0.5 * dt] + [dt] * (num_steps - 1) + [0.5 * dt + free_duration]
+        if num_steps == 0:
+            durations = [free_duration]
+        for step, duration in enumerate(durations):
+            if step > 0:
+                for qubit, qubit_samples in samples.items():
+                    if step - 1 < len(qubit_samples) and qubit_samples[step - 1] != 0:
+                        values, vectors = eigensystems[qubit]
+                        phases = np.exp(-1j * dt * qubit_samples[step - 1] * values)
+                        mps.apply_one_qubit(
+                            (vectors * phases) @ vectors.conj().T, qubit
+                        )
+            crosstalk_layer(duration, step)
+
+    def _get_chain_model(
+        self,
+    ) -> tuple[dict[tuple[int, int], float], dict[int, np.ndarray]]:
+        if self._chain_model is not None:
+            return self._chain_model
+        if self._projected_chain_model is None:
+            # project the static diagonal on the Z_i Z_i+1 of the chain
+            static_diagonal, drives = self._get_local_model()
+            num_qubits = int(np.log2(len(static_diagonal)))
+            registers = list(range(num_qubits))
+            edges = [(i, i + 1) for i in registers[:-1]]
+            tensor = static_diagonal.real.reshape((2,) * num_qubits)
+            z = np.array([1.0, -1.0])
+            strengths = []
+            for i1, i2 in edges:
+                shape1, shape2 = [1] * num_qubits, [1] * num_qubits
+                shape1[i1], shape2[i2] = 2, 2
+                zz = z.reshape(shape1) * z.reshape(shape2)
+                strengths.append(np.mean(tensor * zz))
+            offset = np.mean(static_diagonal.real)
+            projected = ps.zz_diagonal(strengths, edges, registers) + offset
+            if not np.allclose(projected, static_diagonal):
+                raise ValueError("MPS simulation needs nearest neighbour ZZ crosstalk.")
+            # the offset is a global phase
+            self._projected_chain_model = (dict(zip(edges, strengths)), drives)
+        return self._projected_chain_model
+
+    def _get_local_model(self) -> tuple[np.ndarray, dict[int, np.ndarray]]:
+        if self._local_model is None:
+            # read the local drives off the solver operators
+            static_diagonal = self._static_diagonal()
+            operators = np.asarray(self._solver.model.operators)
+            num_qubits = int(np.log2(len(static_diagonal)))
+            identity = np.eye(2**num_qubits)
+            drives = {}
+            for channel, operator in zip(self._solver._hamiltonian_channels, operators):
+                qubit = int(channel[1:])
+                if channel != qiskit.pulse.DriveChannel(qubit).name:
+                    continue
+                tensor = operator.reshape((2,) * (2 * num_qubits))
+                tensor = np.moveaxis(tensor, (qubit, num_qubits + qubit), (0, 1))
+                local = np.trace(
+                    tensor.reshape(2, 2, 2 ** (num_qubits - 1), -1), axis1=2, axis2=3
+                )
+                local = local / 2 ** (num_qubits - 1)
+                if not np.allclose(
+                    ps.apply_local_operator(identity, local, qubit, num_qubits),
+                    operator,
+                ):
+                    raise ValueError(f"Drive of channel {channel} is not local.")
+                drives[qubit] = local
+            self._local_model = (static_diagonal, drives)
+        return self._local_model
+
+    def _get_drift_split(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._drift_split is None:
+            operators = np.asarray(self._solver.model.operators)
+            eigenbasis, eigenvalues = ps.joint_eigenbasis(operators)
+            self._drift_split = (self._static_diagonal(), eigenbasis, eigenvalues)
+        return self._drift_split
+
+    def _static_diagonal(self) -> np.ndarray:
+        model = self._solver.model
+        if model.rotating_frame.frame_operator is not None:
+            raise ValueError("Split propagation needs a solver without rotating frame.")
+        static = np.asarray(model.static_operator)
+        static_diagonal = np.diag(static).copy()
+        if not np.allclose(static, np.diag(static_diagonal)):
+            raise ValueError("Split propagation needs a diagonal static Hamiltonian.")
+        return static_diagonal
 
     def _simulate_two_qubit_moment(
         self, gates: GATE_DICT, virtual_zs: VIRTUAL_ZS, num_qubits: int
-    ) -> Operator:
+    ) -> np.ndarray:
         # TODO: use actual two-qubit pulses
         qc = QuantumCircuit(num_qubits)
         for control, target in gates:
             qc.cx(control, target)
-        op = Operator(qc)
+        # reversing the bits gives the solver ordering of the qubits
+        op = Operator(qc.reverse_bits()).data.astype(self._dtype)
+
+        # virtual zs act before the gates, i.e. op @ diag(rzs)
+        op *= ps.rz_diagonal(virtual_zs, [i for i in range(num_qubits)])
+        return op
 
-        for i in range(num_qubits):
-            if i not in virtual_zs:
-                virtual_zs[i] = 0.0
-        rzs = ps.rz_moment(virtual_zs, [i for i in range(num_qubits)])
-        return op @ rzs
+    def _cx_permutation(self, gates: GATE_DICT, num_qubits: int) -> np.ndarray:
+        # basis states in the solver ordering, register 0 is the leading bit
+        index = np.arange(2**num_qubits)
+        source = index.copy()
+        for control, target in gates:
+            control_bit = (index >> (num_qubits - 1 - control)) & 1
+            source ^= control_bit << (num_qubits - 1 - target)
+        return source
+
+    def _levels_cx_permutation(
+        self, gates: GATE_DICT, num_qubits: int, levels: int
+    ) -> np.ndarray:
+        # as `_cx_permutation`, the target flips only between levels 0 and 1
+        # and only if the control is in level 1
+        index = np.arange(levels**num_qubits)
+        source = index.copy()
+        for control, target in gates:
+            control_level = (index // levels ** (num_qubits - 1 - control)) % levels
+            target_weight = levels ** (num_qubits - 1 - target)
+            target_level = (index // target_weight) % levels
+            flip = (control_level == 1) & (target_level < 2)
+            source[flip] += (1 - 2 * target_level[flip]) * target_weight
+        return source
 
     def _get_moments(self, circuit: QuantumCircuit) -> CIRCUIT_MOMENTS:
         n = circuit.num_qubits
         one_q_coloring, two_q_coloring = self._get_coloring(n)
+        namespace = parameter_namespace(circuit)
 
         # scheduled circuits and get output dag
         circuit = RemoveBarriers()(circuit)
@@ -193,19 +1605,21 @@ class Simulator:
                     gates_dict[index] = f"{gate.op.name}_{color}"
 
                     if virtual := gate.op.label:
-                        virtual_zs.update(self._virtual_str_to_dict(virtual))
+                        virtual_zs.update(self._virtual_str_to_dict(virtual, namespace))
 
                 # two-qubit operation
                 elif len(qargs) == 2:
                     q0, q1 = qargs[0], qargs[1]
                     i0 = scheduled_dag.find_bit(q0).index
                     i1 = scheduled_dag.find_bit(q1).index
-                    color = two_q_coloring[tuple({i0, i1})]
+                    color = two_q_coloring[tuple(sorted((i0, i1)))]
                     gates_dict[(i0, i1)] = f"{gate.op.name}_{color}"
 
                     if virtuals := gate.op.label:
                         for virtual in virtuals.split("&"):
-                            virtual_zs.update(self._virtual_str_to_dict(virtual))
+                            virtual_zs.update(
+                                self._virtual_str_to_dict(virtual, namespace)
+                            )
 
             if gates_dict:
                 moments.append((gates_dict, virtual_zs, len(qargs)))
@@ -213,30 +1627,22 @@ class Simulator:
         if final_virtuals := self._scheduler._final_virtuals:
             virtual_zs = {}
             for qubit in final_virtuals:
-                virtual_zs.update(self._virtual_str_to_dict(final_virtuals[qubit]))
+                virtual_zs.update(
+                    self._virtual_str_to_dict(final_virtuals[qubit], namespace)
+                )
             moments.append(({}, virtual_zs, 1))
 
         return moments
 
-    def _virtual_str_to_dict(self, virtual: str) -> dict[int, str]:
+    def _virtual_str_to_dict(
+        self, virtual: str, namespace: dict | None = None
+    ) -> dict[int, str]:
         processed = virtual.split("|")
-        params = eval(processed[1])
+        params = eval(processed[1], globals(), namespace)
         qargs = eval(processed[2])
         return {qargs._index: params[0]}
 
-    # TODO: generalize for any connectivity?
     def _get_coloring(
         self, n: int
     ) -> tuple[dict[int, str], dict[tuple[int, int], str]]:
-        one_q_coloring = {
-            qubit: "red" if qubit % 2 == 0 else "blue" for qubit in range(n)
-        }
-
-        flag = True
-        two_q_coloring = {}
-        for qubit in range(n - 1):
-            if qubit % 2 == 0:
-                flag = not flag
-            two_q_coloring[tuple({qubit, qubit + 1})] = "blue" if flag else "red"
-
-        return one_q_coloring, two_q_coloring
+        return pulse_coloring(n, self._coupling_map, self._crosstalk_graph)
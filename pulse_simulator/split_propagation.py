@@ -0,0 +1,307 @@
+import numpy as np
+
+from .local_channels import apply_local_operator, apply_two_qubit_operator
+
+# NOTE:     Drift terms like the Z of `rx_model` and the ZZ of `crosstalk_model`
+#           are diagonal, so their exponentials are elementwise phases. The
+#           propagators here split each time step into these phases and the
+#           exponential of the controls (Strang splitting), which is only as
+#           accurate as dt² ||[H_0, [H_0, H_c]]|| allows.
+
+
+def joint_eigenbasis(operators, atol=1e-9):
+    """Common eigenbasis of commuting Hermitian operators.
+
+    Arguments:
+        operators (NumPy.ndarray) -- Operators with shape (number of
+            operators, dim, dim).
+        atol [optional] (Float) -- Tolerance of the diagonalization.
+
+    Raises:
+        ValueError: The operators do not commute.
+
+    Returns:
+        (NumPy.ndarray) Unitary V with the eigenvectors as columns, and
+        (NumPy.ndarray) eigenvalues of shape (number of operators, dim), so
+        that H_j = V diag(λ_j) V†.
+    """
+    operators = np.asarray(operators)
+    # a generic combination of the operators has their common eigenvectors
+    weights = np.random.default_rng(0).normal(size=len(operators))
+    _, eigenbasis = np.linalg.eigh(np.tensordot(weights, operators, axes=1))
+    eigenvalues = np.einsum(
+        "ji,kjl,li->ki", eigenbasis.conj(), operators, eigenbasis
+    ).real
+    reconstructed = np.einsum(
+        "ij,kj,lj->kil", eigenbasis, eigenvalues, eigenbasis.conj()
+    )
+    if not np.allclose(reconstructed, operators, atol=atol):
+        raise ValueError("Operators do not commute.")
+    return eigenbasis, eigenvalues
+
+
+def diagonal_drift_propagate(
+    static_diagonal, eigenbasis, eigenvalues, coefficients, dt, y0, duration=None
+):
+    """Propagate with a diagonal drift and commuting controls.
+
+    Each step of a piecewise constant signal is split into half a step of the
+    drift phases, the controls exponentiated in their common eigenbasis, and
+    another half step of drift. The half steps of neighbouring steps are
+    merged, so each step costs one product with a dense dim x dim matrix.
+
+    Arguments:
+        static_diagonal (NumPy.ndarray) -- Diagonal of the drift H_0.
+        eigenbasis (NumPy.ndarray) -- Common eigenbasis V of the controls,
+            see `joint_eigenbasis`.
+        eigenvalues (NumPy.ndarray) -- Eigenvalues of the controls.
+        coefficients (NumPy.ndarray) -- Real coefficient of each control in
+            each step, with shape (number of controls, number of steps).
+        dt (Float) -- Duration of a step.
+        y0 (NumPy.ndarray) -- Initial state vectors or operator.
+        duration [optional] (Float) -- Total time, the steps are followed by
+            free evolution. Defaults to the duration of the steps.
+
+    Returns:
+        (NumPy.ndarray) Propagated `y0`.
+    """
+    num_steps = coefficients.shape[1]
+    free_duration = num_steps * dt if duration is None else duration
+    free_duration -= num_steps * dt
+    shape = (-1,) + (1,) * (y0.ndim - 1)
+    if num_steps == 0:
+        return np.exp(-1j * free_duration * static_diagonal).reshape(shape) * y0
+
+    half_drift = np.exp(-0.5j * dt * static_diagonal)
+    transfer = eigenbasis.conj().T @ ((half_drift**2)[:, None] * eigenbasis)
+    controls = np.exp(-1j * dt * coefficients.T @ eigenvalues)
+
+    y = eigenbasis.conj().T @ (half_drift.reshape(shape) * y0)
+    for step in range(num_steps):
+        y = controls[step].reshape(shape) * y
+        if step < num_steps - 1:
+            y = transfer @ y
+    y = eigenbasis @ y
+    final_phases = half_drift * np.exp(-1j * free_duration * static_diagonal)
+    return final_phases.reshape(shape) * y
+
+
+# weights of the fourth order triple jump composition of second order steps
+TRIPLE_JUMP_WEIGHTS = [
+    1 / (2 - 2 ** (1 / 3)),
+    -(2 ** (1 / 3)) / (2 - 2 ** (1 / 3)),
+    1 / (2 - 2 ** (1 / 3)),
+]
+
+
+def split_operator_propagate(
+    static_diagonal,
+    drives,
+    coefficients,
+    dt,
+    y0,
+    duration=None,
+    order=2,
+    substeps=1,
+    levels=2,
+):
+    """Propagate with one-qubit drives and a diagonal drift.
+
+    Each step is split into half a step of drift phases, the one-qubit drive
+    rotations applied factor by factor, and another half step of drift
+    (second order), or a triple jump of such steps (fourth order). A step
+    costs O(n 2^n) on state vectors, and no 2^n x 2^n matrix is formed.
+
+    Arguments:
+        static_diagonal (NumPy.ndarray) -- Diagonal of the drift H_0.
+        drives (Dict{Int: NumPy.ndarray}) -- Hermitian drive operator of
+            shape (levels, levels) by qubit, where qubit 0 is the most
+            significant.
+        coefficients (Dict{Int: NumPy.ndarray}) -- Real samples by qubit.
+        dt (Float) -- Duration of a sample.
+        y0 (NumPy.ndarray) -- Initial state vectors as columns, or a single
+            state vector.
+        duration [optional] (Float) -- Total time, the samples are followed
+            by free evolution. Defaults to the duration of the samples.
+        order [optional] (Int) -- Order of the splitting, 2 or 4.
+        substeps [optional] (Int) -- Splitting steps per sample.
+        levels [optional] (Int) -- Levels of each qubit, see
+            `transmon_local_model`. Defaults to 2.
+
+    Returns:
+        (NumPy.ndarray) Propagated `y0`.
+    """
+    if order == 2:
+        weights = [1.0]
+    elif order == 4:
+        weights = TRIPLE_JUMP_WEIGHTS
+    else:
+        raise ValueError(f"Splitting order must be 2 or 4, got {order}.")
+
+    num_qubits = int(round(np.log(len(static_diagonal)) / np.log(levels)))
+    num_steps = max([len(samples) for samples in coefficients.values()] + [0])
+    free_duration = num_steps * dt if duration is None else duration
+    free_duration -= num_steps * dt
+    shape = (-1,) + (1,) * (y0.ndim - 1)
+
+    h = dt / substeps
+    half_drifts = [
+        np.exp(-0.5j * weight * h * static_diagonal).reshape(shape)
+        for weight in weights
+    ]
+    eigensystems = {qubit: np.linalg.eigh(drives[qubit]) for qubit in coefficients}
+
+    y = y0
+    for step in range(num_steps):
+        for _ in range(substeps):
+            for weight, half_drift in zip(weights, half_drifts):
+                y = half_drift * y
+                for qubit, samples in coefficients.items():
+                    if step < len(samples) and samples[step] != 0:
+                        values, vectors = eigensystems[qubit]
+                        phases = np.exp(-1j * weight * h * samples[step] * values)
+                        rotation = (vectors * phases) @ vectors.conj().T
+                        y = apply_local_operator(y, rotation, qubit, num_qubits)
+                y = half_drift * y
+    return np.exp(-1j * free_duration * static_diagonal).reshape(shape) * y
+
+
+def pauli_z_decomposition(static_diagonal, atol=1e-9):
+    """Split a diagonal into one- and two-qubit Z terms.
+
+    Arguments:
+        static_diagonal (NumPy.ndarray) -- Diagonal of the drift H_0, where
+            qubit 0 is the most significant.
+        atol [optional] (Float) -- Tolerance of the terms of three or more
+            qubits, which must vanish.
+
+    Raises:
+        ValueError: The diagonal has terms of three or more qubits.
+
+    Returns:
+        (Float) Constant c, (NumPy.ndarray) fields h_i of Z_i, and
+        (Dict{Tuple(Int, Int): Float}) couplings J_ij of Z_i Z_j, such that
+        H_0 = c + Σ h_i Z_i + Σ J_ij Z_i Z_j.
+    """
+    num_qubits = int(np.log2(len(static_diagonal)))
+    # Walsh-Hadamard transform, index bit i set for a factor Z_i
+    coefficients = np.asarray(static_diagonal).real.reshape((2,) * num_qubits)
+    for axis in range(num_qubits):
+        zero, one = np.moveaxis(coefficients, axis, 0)
+        coefficients = np.moveaxis(np.stack([zero + one, zero - one]) / 2, 0, axis)
+    coefficients = coefficients.reshape(-1)
+
+    weights = np.array([bin(index).count("1") for index in range(len(coefficients))])
+    if np.any(np.abs(coefficients[weights > 2]) > atol):
+        raise ValueError("Diagonal has terms of three or more qubits.")
+    bit = [1 << (num_qubits - 1 - i) for i in range(num_qubits)]
+    fields = np.array([coefficients[bit[i]] for i in range(num_qubits)])
+    couplings = {}
+    for i in range(num_qubits):
+        for j in range(i + 1, num_qubits):
+            if abs(coefficients[bit[i] | bit[j]]) > atol:
+                couplings[(i, j)] = coefficients[bit[i] | bit[j]]
+    return coefficients[0], fields, couplings
+
+
+def _sampled_propagator(static_hamiltonian, operators, coefficients, dt):
+    # Π_k exp(-i dt H_k) for the rows of `coefficients`, latest on the left
+    hamiltonians = static_hamiltonian + np.tensordot(coefficients, operators, axes=1)
+    values, vectors = np.linalg.eigh(hamiltonians)
+    steps = (vectors * np.exp(-1j * dt * values)[:, None, :]) @ np.conj(
+        np.swapaxes(vectors, 1, 2)
+    )
+    propagator = np.eye(len(static_hamiltonian), dtype=complex)
+    for step in steps:
+        propagator = step @ propagator
+    return propagator
+
+
+def pulse_propagator_table(fields, couplings, drives, pulses, dt):
+    """Propagators of every pulse on every qubit, and their ZZ corrections.
+
+    The pulses are padded with zeros to the longest one, and an extra pulse
+    of zeros stands for an idle qubit. A qubit propagates under its field
+    and drive, and the correction of an edge is the exact propagator of the
+    two qubits with their coupling, relative to their one-qubit propagators.
+
+    Arguments:
+        fields (NumPy.ndarray) -- Fields h_i of Z_i, see
+            `pauli_z_decomposition`.
+        couplings (Dict{Tuple(Int, Int): Float}) -- Couplings J_ij of Z_i Z_j.
+        drives (Dict{Int: NumPy.ndarray}) -- 2x2 Hermitian drive operator by
+            qubit, for every qubit of the register.
+        pulses (List[NumPy.ndarray]) -- Real samples of each pulse.
+        dt (Float) -- Duration of a sample.
+
+    Returns:
+        (NumPy.ndarray) Contiguous one-qubit propagators of shape (number of
+        qubits, number of pulses + 1, 2, 2), and (NumPy.ndarray) contiguous
+        4x4 corrections of shape (number of couplings, number of pulses + 1,
+        number of pulses + 1, 4, 4), in the order of `couplings`.
+    """
+    num_qubits = len(fields)
+    num_samples = max([len(samples) for samples in pulses] + [0])
+    samples = np.zeros((len(pulses) + 1, num_samples))
+    for j, pulse in enumerate(pulses):
+        samples[j, : len(pulse)] = pulse
+    z = np.diag([1.0, -1.0])
+    identity = np.eye(2)
+
+    table = np.empty((num_qubits, len(samples), 2, 2), dtype=complex)
+    for i in range(num_qubits):
+        for j, pulse in enumerate(samples):
+            table[i, j] = _sampled_propagator(
+                fields[i] * z, drives[i][None], pulse[:, None], dt
+            )
+
+    corrections = np.empty(
+        (len(couplings), len(samples), len(samples), 4, 4), dtype=complex
+    )
+    for k, ((i1, i2), coupling) in enumerate(couplings.items()):
+        static = (
+            fields[i1] * np.kron(z, identity)
+            + fields[i2] * np.kron(identity, z)
+            + coupling * np.kron(z, z)
+        )
+        operators = np.array(
+            [np.kron(drives[i1], identity), np.kron(identity, drives[i2])]
+        )
+        for j1, pulse1 in enumerate(samples):
+            for j2, pulse2 in enumerate(samples):
+                pair = _sampled_propagator(
+                    static, operators, np.stack([pulse1, pulse2], axis=1), dt
+                )
+                local = np.kron(table[i1, j1], table[i2, j2])
+                corrections[k, j1, j2] = local.conj().T @ pair
+    return table, corrections
+
+
+def table_moment_propagate(rotations, corrections, static_diagonal, free_duration, y0):
+    """Propagate a moment of tabulated propagators, see
+    `pulse_propagator_table`.
+
+    The corrections of different edges are applied one after another, which
+    neglects terms of second order in the couplings.
+
+    Arguments:
+        rotations (Dict{Int: NumPy.ndarray}) -- 2x2 propagator by qubit,
+            where qubit 0 is the most significant.
+        corrections (Dict{Tuple(Int, Int): NumPy.ndarray}) -- 4x4 correction
+            by edge.
+        static_diagonal (NumPy.ndarray) -- Diagonal of the drift H_0.
+        free_duration (Float) -- Free evolution after the pulses.
+        y0 (NumPy.ndarray) -- Initial state vectors as columns, or a single
+            state vector.
+
+    Returns:
+        (NumPy.ndarray) Propagated `y0`.
+    """
+    num_qubits = int(np.log2(len(static_diagonal)))
+    shape = (-1,) + (1,) * (y0.ndim - 1)
+    y = y0
+    for edge, correction in corrections.items():
+        y = apply_two_qubit_operator(y, correction, edge, num_qubits)
+    for qubit, rotation in rotations.items():
+        y = apply_local_operator(y, rotation, qubit, num_qubits)
+    return np.exp(-1j * free_duration * static_diagonal).reshape(shape) * y
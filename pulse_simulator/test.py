@@ -4,7 +4,6 @@ import functools
 import qiskit_dynamics as qk_d
 import qiskit.providers.fake_provider as qk_fp
 import numpy as np
-import csv
 import qiskit
 
 backend = qk_fp.FakeManila()
@@ -55,20 +54,7 @@ sim = ps.simulator.Simulator(
 
 # load and set pulses
 file_name = "./pico-pulses/saved-pulses-2023-12-13/a_single_qubit_gateset_R1e-6.csv"
-gates = []
-with open(file_name) as file:
-    reader = csv.reader(file)
-    for row in reader:
-        gates.append(np.array([float(x) for x in row]))
-
-expected_angles = [np.pi / 2, np.pi / 2, np.pi / 4, np.pi / 4]
-for i in range(len(gates)):
-    normalization = np.trapz(gates[i], dx=dt) / expected_angles[i]
-    gates[i] = gates[i] / normalization
-
-for pulse, name in zip(gates, ["x_blue", "x_red", "sx_blue", "sx_red"]):
-    pulse = qiskit.pulse.Waveform(pulse, limit_amplitude=False)
-    sim.set_pulse(name, pulse)
+sim.set_pulses(ps.load_pulse_library(file_name, dt))
 
 def create_initial_state(qr, cr):
     """
@@ -0,0 +1,317 @@
+from .qiskit_backend_utils import (
+    get_drive_channel,
+    get_control_channel,
+    vars_anharmonicity,
+    vars_coupling,
+    vars_frequency,
+    vars_rabi,
+)
+from .two_qubit_models import zz_couplings
+
+import functools
+import numpy as np
+import scipy.sparse
+
+# NOTE:     Transmons are Duffing oscillators truncated to `levels` levels.
+#           The characters of `from_label` extend to more levels: D and C are
+#           the annihilation and creation operators, X = C + D, Y = iC - iD,
+#           Z = I - 2N with the number operator N, and digits project on a
+#           level. With two levels these are the operators of `from_label`.
+#           Register operators are sparse, so the (levels^n)^2 dense matrices
+#           are never formed; each factor is a band matrix.
+
+
+def level_operator(char, levels):
+    """Single transmon operator of a label character.
+
+    Arguments:
+        char (Char) -- One of I, D, C, N, X, Y, Z or a level digit.
+        levels (Int) -- Number of levels of the transmon.
+
+    Returns:
+        (NumPy.ndarray) Operator of shape (levels, levels).
+    """
+    destroy = np.diag(np.sqrt(np.arange(1, levels)), k=1).astype(complex)
+    create = destroy.T.copy()
+    number = np.diag(np.arange(levels)).astype(complex)
+    identity = np.eye(levels, dtype=complex)
+    if char.isdigit():
+        if int(char) >= levels:
+            raise ValueError(f"Level {char} is not below {levels} levels.")
+        projector = np.zeros((levels, levels), dtype=complex)
+        projector[int(char), int(char)] = 1.0
+        return projector
+    operators = {
+        "I": identity,
+        "D": destroy,
+        "C": create,
+        "N": number,
+        "X": create + destroy,
+        "Y": 1j * create - 1j * destroy,
+        "Z": identity - 2 * number,
+    }
+    if char not in operators:
+        raise ValueError(f"Label character {char} has no transmon operator.")
+    return operators[char]
+
+
+def levels_from_label(label, levels):
+    """Return a sparse tensor product of single transmon operators.
+
+    The first character acts on the most significant transmon, as for
+    `from_label`.
+
+    Arguments:
+        label (Str) -- Single transmon operator string.
+        levels (Int) -- Number of levels of each transmon.
+
+    Returns:
+        (scipy.sparse.csr_matrix) The operator of the register.
+    """
+    factors = [scipy.sparse.csr_matrix(level_operator(c, levels)) for c in label]
+    return functools.reduce(lambda a, b: scipy.sparse.kron(a, b, format="csr"), factors)
+
+
+def levels_diagonal(diagonals, registers, levels):
+    """Diagonal of a sum of single transmon diagonal operators.
+
+    Arguments:
+        diagonals (Dict{Int: NumPy.ndarray}) -- Diagonal of length `levels`
+            by register.
+        registers (List[Int]) -- Qubits in circuit, the first is the most
+            significant.
+        levels (Int) -- Number of levels of each transmon.
+
+    Returns:
+        (NumPy.ndarray) Diagonal of length levels^n.
+    """
+    n = len(registers)
+    total = np.zeros((levels,) * n)
+    for register, diagonal in diagonals.items():
+        shape = [1] * n
+        shape[registers.index(register)] = levels
+        total = total + np.reshape(diagonal, shape)
+    return total.reshape(-1)
+
+
+def transmon_rx_model(
+    qubit,
+    registers,
+    backend,
+    variables,
+    levels=3,
+    rotating_frame=True,
+    return_params=False,
+):
+    """Construct a single transmon model for pulse gates, the `rx_model` with
+    `levels` levels. This model is provided in the frame of the qubit by
+    default.
+
+    The drift is ω N + α/2 N (N - 1) with the anharmonicity α, and the drive
+    is X = C + D, which couples neighbouring levels.
+
+    Arguments:
+        qubit (Int) -- Qubit index
+        registers (List[Int]) -- Qubits in circuit
+        backend (qk.providers.fake_provider.FakePulseBackend) -- Backend
+            needed for drive channels.
+        variables (Dict{Str, Int}) -- Backend configuration properties.
+        levels [optional] (Int) -- Number of levels. Default 3.
+        rotating_frame (Bool) -- Use the rotating frame. Default true.
+
+    Returns:
+        Drift operator, List[Control operators], List[Drive channels], as
+        scipy.sparse.csr_matrix
+    """
+    # Unpack parameters
+    try:
+        w = 2 * np.pi * variables[vars_frequency(qubit)]
+        α = 2 * np.pi * variables[vars_anharmonicity(qubit)]
+        r = 2 * np.pi * variables[vars_rabi(qubit)]
+    except Exception as e:
+        print(f"Missing required parameter for transmon model on qubit {qubit}.")
+        raise e
+
+    params = {}
+    dim = levels ** len(registers)
+    number = np.arange(levels)
+
+    # Get drift, which is diagonal
+    w_frame = 0.0 if rotating_frame else w
+    drift_diagonal = levels_diagonal(
+        {qubit: w_frame * number + α / 2 * number * (number - 1)}, registers, levels
+    )
+    drift_op = scipy.sparse.diags(drift_diagonal, format="csr", shape=(dim, dim))
+    params["Drift"] = (
+        f"{w_frame: .2e} * N_{qubit} + {α / 2: .2e} * N_{qubit}(N_{qubit}-1)"
+    )
+
+    # Get drive
+    control_label = "".join("X" if q == qubit else "I" for q in registers)
+    control_ch = get_drive_channel(qubit, backend, name=True)
+    control_op = r * levels_from_label(control_label, levels)
+    params[f"{control_ch}"] = f"{r: .2e} * X_{qubit}"
+
+    if return_params:
+        return drift_op, [control_op], [control_ch], params
+    else:
+        return drift_op, [control_op], [control_ch]
+
+
+def transmon_local_model(qubit, backend, variables, levels=3, rotating_frame=True):
+    """Construct the single transmon model of `transmon_rx_model` as dense
+    operators of the transmon alone, see `rx_local_model`.
+
+    Returns:
+        Drift operator, List[Control operators], List[Drive channels]
+    """
+    drift_op, control_ops, control_chs = transmon_rx_model(
+        qubit, [qubit], backend, variables, levels, rotating_frame=rotating_frame
+    )
+    return drift_op.toarray(), [op.toarray() for op in control_ops], control_chs
+
+
+def transmon_crosstalk_diagonal(registers, graph, variables, levels=3):
+    """The diagonal of the crosstalk Hamiltonian of transmons, see
+    `crosstalk_model`. The Z_i Z_j of each edge extend to more levels as
+    (I - 2N_i)(I - 2N_j), which is `crosstalk_model` on the qubit subspace.
+
+    Arguments:
+        registers -- The allowed qubits from the backend.
+        graph (List[Tuple(Int, Int)]) -- Undirected edge list
+        variables (Dict{Str, Int}) -- Backend configuration properties.
+        levels [optional] (Int) -- Number of levels. Default 3.
+
+    Returns:
+        (NumPy.ndarray) Diagonal of length levels^n.
+    """
+    n = len(registers)
+    edges = [e for e in graph if e[0] in registers and e[1] in registers]
+    z = 1.0 - 2.0 * np.arange(levels)
+    total = np.zeros((levels,) * n)
+    for value, (i1, i2) in zip(zz_couplings(edges, variables), edges):
+        shape1, shape2 = [1] * n, [1] * n
+        shape1[registers.index(i1)] = levels
+        shape2[registers.index(i2)] = levels
+        total = total + value * z.reshape(shape1) * z.reshape(shape2)
+    return total.reshape(-1)
+
+
+def transmon_cross_resonance_model(
+    qubits, registers, backend, variables, levels=3, return_params=False
+):
+    """Construct a two transmon model for pulse CR gates, in the frame where
+    both transmons rotate at the target frequency.
+
+    The drift has the detuning Δ of the control, the anharmonicities, and the
+    exchange coupling J (C_c D_t + D_c C_t), so that ZZ coupling and leakage
+    follow from the model itself. The CR channel and the drive of the
+    control both act with X_c, the latter with a carrier of Δ in this frame.
+
+    Arguments:
+        qubits (List[Int]) -- The two qubits, ordered as (control, target).
+        registers (List[Int]) -- Qubits in circuit
+        backend (qk.providers.fake_provider.FakePulseBackend) -- Backend for
+            control channels.
+        variables (Dict{Str, Int}) -- Backend configuration properties.
+        levels [optional] (Int) -- Number of levels. Default 3.
+
+    Returns:
+        Drift operator, List[Control operators], List[Drive channels], as
+        scipy.sparse.csr_matrix
+    """
+    # Unpack qubits
+    i_c, i_t = qubits
+
+    # Get channel labels
+    cr_drive_l = get_control_channel(i_c, i_t, backend, name=True)
+    targ_drive_l = get_drive_channel(i_t, backend, name=True)
+    ctrl_drive_l = get_drive_channel(i_c, backend, name=True)
+
+    # Unpack parameters
+    try:
+        J = 2 * np.pi * variables[vars_coupling(i_c, i_t)]
+        αc = 2 * np.pi * variables[vars_anharmonicity(i_c)]
+        αt = 2 * np.pi * variables[vars_anharmonicity(i_t)]
+        ωc = 2 * np.pi * variables[vars_frequency(i_c)]
+        ωt = 2 * np.pi * variables[vars_frequency(i_t)]
+        rc = 2 * np.pi * variables[vars_rabi(i_c)]
+        rt = 2 * np.pi * variables[vars_rabi(i_t)]
+    except Exception as e:
+        print(f"Missing parameter for transmon CR model on {qubits}.")
+        raise e
+    Δct = ωc - ωt
+
+    def label(chars):
+        return "".join(chars.get(q, "I") for q in registers)
+
+    dim = levels ** len(registers)
+    number = np.arange(levels)
+    drift_diagonal = levels_diagonal(
+        {
+            i_c: Δct * number + αc / 2 * number * (number - 1),
+            i_t: αt / 2 * number * (number - 1),
+        },
+        registers,
+        levels,
+    )
+    exchange = levels_from_label(label({i_c: "C", i_t: "D"}), levels)
+    drift_op = scipy.sparse.diags(drift_diagonal, format="csr", shape=(dim, dim))
+    drift_op = drift_op + J * (exchange + exchange.getH())
+
+    XI = levels_from_label(label({i_c: "X"}), levels)
+    IX = levels_from_label(label({i_t: "X"}), levels)
+    cr_drive_op = rc * XI
+    ctrl_drive_op = rc * XI
+    targ_drive_op = rt * IX
+
+    params = {
+        "Model": f"Transmon{levels}",
+        "Drift": f"{Δct: .2e} * N_{i_c} + Duffing + {J: .2e} * (C_{i_c} D_{i_t} + h.c.)",
+        f"{cr_drive_l}": f"{rc: .2e} * X_{i_c}",
+        f"{targ_drive_l}": f"{rt: .2e} * X_{i_t}",
+        f"{ctrl_drive_l}": f"{rc: .2e} * X_{i_c}",
+    }
+    control_ops = [cr_drive_op, ctrl_drive_op, targ_drive_op]
+    control_channels = [cr_drive_l, ctrl_drive_l, targ_drive_l]
+
+    if return_params:
+        return drift_op, control_ops, control_channels, params
+    else:
+        return drift_op, control_ops, control_channels
+
+
+def computational_indices(num_qubits, levels):
+    """Indices of the basis states of a transmon register with every
+    transmon in level 0 or 1, in the order of the qubit basis.
+
+    Arguments:
+        num_qubits (Int) -- Number of transmons.
+        levels (Int) -- Number of levels of each transmon.
+
+    Returns:
+        (NumPy.ndarray) Indices of length 2^n.
+    """
+    bits = (np.arange(2**num_qubits)[:, None] >> np.arange(num_qubits)[::-1]) & 1
+    return bits @ (levels ** np.arange(num_qubits)[::-1])
+
+
+def leakage_populations(state, num_qubits, levels):
+    """Population of each transmon above level 1.
+
+    Arguments:
+        state (NumPy.ndarray) -- State vector of the register.
+        num_qubits (Int) -- Number of transmons.
+        levels (Int) -- Number of levels of each transmon.
+
+    Returns:
+        (NumPy.ndarray) Leaked population of each transmon.
+    """
+    populations = np.abs(np.reshape(state, (levels,) * num_qubits)) ** 2
+    leakage = []
+    for qubit in range(num_qubits):
+        marginal = np.sum(
+            populations, axis=tuple(q for q in range(num_qubits) if q != qubit)
+        )
+        leakage.append(np.sum(marginal[2:]))
+    return np.array(leakage)
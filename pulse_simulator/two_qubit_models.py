@@ -9,6 +9,7 @@ from .qiskit_backend_utils import (
 )
 
 import numpy as np
+from qiskit.quantum_info.operators import Operator
 
 
 def zz_coupling(edge, variables):
@@ -22,24 +23,62 @@ def zz_coupling(edge, variables):
     Returns:
         Value of ZZ coupling for edge
     """
-    i1, i2 = edge
-    try:
-        α1 = 2 * np.pi * variables[vars_anharmonicity(i1)]
-        α2 = 2 * np.pi * variables[vars_anharmonicity(i2)]
-        # Edges are assumed to be undirected
-        α = (α1 + α2) / 2
-        J12 = 2 * np.pi * variables[vars_coupling(i1, i2)]
-        ω1 = 2 * np.pi * variables[vars_frequency(i1)]
-        ω2 = 2 * np.pi * variables[vars_frequency(i2)]
-    except Exception as e:
-        print(f"Missing required parameter for crosstalk edge {edge}.")
-        raise e
+    return zz_couplings([edge], variables)[0]
+
+
+def zz_couplings(edges, variables):
+    """Return the crosstalk coupling amounts of many edges at once.
+
+    Arguments:
+        edges (List[Tuple(Int, Int)]) -- Undirected edge list
+        variables (Dict{Str, Int}) -- Backend configuration properties.
+
+    Returns:
+        (NumPy.ndarray) Value of ZZ coupling for each edge
+    """
+    num_qubits = max([max(edge) + 1 for edge in edges] + [0])
+    frequencies = np.zeros(num_qubits)
+    anharmonicities = np.zeros(num_qubits)
+    couplings = np.zeros(len(edges))
+    for k, (i1, i2) in enumerate(edges):
+        try:
+            for i in (i1, i2):
+                frequencies[i] = variables[vars_frequency(i)]
+                anharmonicities[i] = variables[vars_anharmonicity(i)]
+            couplings[k] = variables[vars_coupling(i1, i2)]
+        except Exception as e:
+            print(f"Missing required parameter for crosstalk edge {(i1, i2)}.")
+            raise e
+    return zz_coupling_strengths(edges, frequencies, anharmonicities, couplings)
+
+
+def zz_coupling_strengths(edges, frequencies, anharmonicities, couplings):
+    """Return the crosstalk coupling amounts from arrays of qubit properties.
+
+    Leading axes of the arrays are broadcast, e.g. over perturbed variables.
 
-    Δ12 = ω1 - ω2
+    Arguments:
+        edges (List[Tuple(Int, Int)]) -- Undirected edge list
+        frequencies (NumPy.ndarray) -- Qubit frequencies, indexed by qubit
+            in the last axis.
+        anharmonicities (NumPy.ndarray) -- Qubit anharmonicities, indexed by
+            qubit in the last axis.
+        couplings (NumPy.ndarray) -- Coupling of each edge in the last axis.
+
+    Returns:
+        (NumPy.ndarray) Value of ZZ coupling for each edge in the last axis
+    """
+    i1, i2 = np.reshape(np.array(edges, dtype=int), (-1, 2)).T
+    frequencies = np.asarray(frequencies)
+    anharmonicities = np.asarray(anharmonicities)
+    # Edges are assumed to be undirected
+    α = 2 * np.pi * (anharmonicities[..., i1] + anharmonicities[..., i2]) / 2
+    J12 = 2 * np.pi * np.asarray(couplings)
+    Δ12 = 2 * np.pi * (frequencies[..., i1] - frequencies[..., i2])
     return -2 * α * J12**2 / (Δ12**2 - α**2)
 
 
-def crosstalk_model(registers, graph, variables):
+def crosstalk_model(registers, graph, variables, diagonal=False):
     """The crosstalk Hamiltonian of the circuit. The crosstalk is limited
     to the active registers provided, even if the graph includes additional
     edges.
@@ -48,17 +87,48 @@ def crosstalk_model(registers, graph, variables):
         registers -- The allowed qubits from the backend.
         graph (List[Tuple(Int, Int)]) -- Undirected edge list
         variables (Dict{Str, Int}) -- Backend configuration properties.
+        diagonal [optional] (Bool) -- Return the diagonal of the crosstalk,
+            which is diagonal in the computational basis. Default false.
+
+    Returns:
+        Operator of crosstalk, or its diagonal as NumPy.ndarray
+    """
+    edges = [e for e in graph if e[0] in registers and e[1] in registers]
+    values = zz_couplings(edges, variables)
+    crosstalk = zz_diagonal(values, edges, list(registers))
+    if diagonal:
+        return crosstalk
+    if not edges:
+        return 0.0
+    return Operator(np.diag(crosstalk).astype(complex))
+
+
+def zz_diagonal(values, edges, registers):
+    """The diagonal of the sum of value * Z_i Z_j over edges, accumulated
+    edge by edge so that no per-edge diagonals are stored.
+
+    Arguments:
+        values (NumPy.ndarray) -- ZZ strength of each edge in the last axis.
+            Leading axes are broadcast, e.g. over perturbed variables.
+        edges (List[Tuple(Int, Int)]) -- Edges within the registers.
+        registers (List[Int]) -- Qubits in circuit, the first is the most
+            significant as for `to_label`.
 
     Returns:
-        Operator of crosstalk
+        (NumPy.ndarray) Diagonal of length 2^n in the last axis.
     """
-    operator = 0.0
-    for ZZ_edge in graph:
-        if ZZ_edge[0] in registers and ZZ_edge[1] in registers:
-            ZZ_value = zz_coupling(ZZ_edge, variables)
-            ZZ_label = to_label({i: "Z" for i in ZZ_edge}, registers)
-            operator += ZZ_value * from_label(ZZ_label)
-    return operator
+    values = np.asarray(values, dtype=float)
+    batch = values.shape[:-1]
+    n = len(registers)
+    z = np.array([1.0, -1.0])
+    total = np.zeros(batch + (2,) * n)
+    for k, (i1, i2) in enumerate(edges):
+        shape1, shape2 = [1] * n, [1] * n
+        shape1[registers.index(i1)] = 2
+        shape2[registers.index(i2)] = 2
+        value = values[..., k].reshape(batch + (1,) * n)
+        total += value * z.reshape(shape1) * z.reshape(shape2)
+    return total.reshape(batch + (-1,))
 
 
 def cross_resonance_model(
@@ -0,0 +1,81 @@
+import pathlib
+import warnings
+
+import pytest
+import qiskit.providers.fake_provider as qk_fp
+import qiskit_dynamics as qk_d
+
+import pulse_simulator as ps
+
+PULSE_FILE = (
+    pathlib.Path(__file__).parent.parent
+    / "pico-pulses"
+    / "saved-pulses-2023-12-13"
+    / "a_single_qubit_gateset_R1e-6.csv"
+)
+
+
+@pytest.fixture(scope="session")
+def backend():
+    return qk_fp.FakeManila()
+
+
+@pytest.fixture(scope="session")
+def dt(backend):
+    return backend.configuration().dt * 1e9
+
+
+@pytest.fixture(scope="session")
+def config_vars(backend):
+    return ps.backend_simulation_vars(backend, rabi=False, units=1e9)
+
+
+@pytest.fixture(scope="session")
+def pulses(dt):
+    return ps.load_pulse_library(str(PULSE_FILE), dt)
+
+
+@pytest.fixture(scope="session")
+def make_solver(backend, dt, config_vars):
+    """Solver of `test.py` on the first qubits of the backend."""
+
+    def make(num_qubits):
+        registers = [i for i in range(num_qubits)]
+        Hs_control = []
+        Hs_channels = []
+        for qubit in registers:
+            _, Hjs_control, Hjs_channel = ps.rx_model(
+                qubit, registers, backend, config_vars, rotating_frame=False
+            )
+            Hs_control += Hjs_control
+            Hs_channels += Hjs_channel
+        H_xtalk = ps.crosstalk_model(registers, ps.backend_edges(backend), config_vars)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return qk_d.Solver(
+                static_hamiltonian=H_xtalk,
+                hamiltonian_operators=Hs_control,
+                rotating_frame=None,
+                hamiltonian_channels=Hs_channels,
+                channel_carrier_freqs={ch: 0.0 for ch in Hs_channels},
+                dt=dt,
+            )
+
+    return make
+
+
+@pytest.fixture
+def make_simulator(backend, pulses, make_solver):
+    """Simulator with the bundled pulses on the first qubits of the backend."""
+
+    def make(num_qubits=3, **kwargs):
+        sim = ps.simulator.Simulator(
+            basis_gates=["rz", "sx", "x", "cx"],
+            solver=make_solver(num_qubits),
+            backend=backend,
+            **kwargs,
+        )
+        sim.set_pulses(pulses)
+        return sim
+
+    return make
@@ -0,0 +1,119 @@
+import numpy as np
+import qiskit
+from qiskit.quantum_info import Operator
+
+import pulse_simulator as ps
+
+BASIS = ["rz", "sx", "x", "cx"]
+
+
+def _packed(qc):
+    scheduler = ps.RobustScheduler(BASIS, pack_moments=True)
+    return scheduler.run(qc), scheduler.get_packing_report()
+
+
+def test_pack_moments_sinks_one_qubit_moment():
+    qc = qiskit.QuantumCircuit(3)
+    qc.sx(0)
+    qc.cx(1, 2)
+    qc.sx(1)
+    packed, report = _packed(qc)
+    assert report == {"moments_before": 3, "moments_after": 2}
+    assert Operator(packed).equiv(Operator(qc))
+
+
+def test_pack_moments_preserves_operator():
+    rng = np.random.default_rng(1)
+    reduced = 0
+    for _ in range(20):
+        qc = qiskit.QuantumCircuit(4)
+        for _ in range(12):
+            kind = rng.integers(4)
+            if kind == 0:
+                qc.sx(rng.integers(4))
+            elif kind == 1:
+                qc.x(rng.integers(4))
+            elif kind == 2:
+                qc.rz(rng.normal(), rng.integers(4))
+            else:
+                a = rng.integers(3)
+                qc.cx(a, a + 1)
+        packed, report = _packed(qc)
+        assert report["moments_after"] <= report["moments_before"]
+        reduced += report["moments_after"] < report["moments_before"]
+        assert Operator(packed).equiv(Operator(qc))
+    assert reduced > 0
+
+
+def _rz_circuit(theta):
+    qc = qiskit.QuantumCircuit(3)
+    qc.sx(0)
+    qc.rz(theta, 0)
+    qc.sx(0)
+    return qc
+
+
+def test_scheduler_reattaches_parameterized_rz():
+    theta = qiskit.circuit.Parameter("θ")
+    qc = _rz_circuit(theta)
+    scheduled = ps.RobustScheduler(BASIS).run(qc)
+    assert scheduled.parameters == qc.parameters
+    bound = scheduled.assign_parameters({theta: 0.4})
+    assert Operator(bound).equiv(Operator(qc.assign_parameters({theta: 0.4})))
+
+
+def test_circuit_key_distinguishes_parameters_of_same_name():
+    first = _rz_circuit(qiskit.circuit.Parameter("θ"))
+    second = _rz_circuit(qiskit.circuit.Parameter("θ"))
+    assert ps.circuit_key(first) != ps.circuit_key(second)
+    assert ps.circuit_key(first) == ps.circuit_key(first.copy())
+
+
+def _trotter_step(dt):
+    step = qiskit.QuantumCircuit(2, name="trotter_step")
+    step.rzz(dt, 0, 1)
+    step.rx(dt, 0)
+    qc = qiskit.QuantumCircuit(2)
+    qc.append(step.to_gate(), [0, 1])
+    return qc
+
+
+def test_scheduler_distinguishes_custom_gates_of_same_name():
+    scheduler = ps.RobustScheduler(BASIS)
+    for dt in [0.05, 0.5]:
+        qc = _trotter_step(dt)
+        assert Operator(scheduler.run(qc)).equiv(Operator(qc))
+
+
+def test_circuit_key_of_gate_bodies_and_conditions():
+    assert ps.circuit_key(_trotter_step(0.05)) != ps.circuit_key(_trotter_step(0.5))
+    assert ps.circuit_key(_trotter_step(0.05)) == ps.circuit_key(_trotter_step(0.05))
+
+    matrix = qiskit.quantum_info.random_unitary(2, seed=1).data
+    keys = set()
+    for phase in [0.0, 1e-12]:
+        qc = qiskit.QuantumCircuit(1)
+        qc.unitary(matrix * np.exp(1j * phase), [0])
+        keys.add(ps.circuit_key(qc))
+    assert len(keys) == 2
+
+    keys = set()
+    for value in [None, 0, 1]:
+        qc = qiskit.QuantumCircuit(1, 1)
+        gate = qc.x(0)
+        if value is not None:
+            gate.c_if(0, value)
+        keys.add(ps.circuit_key(qc))
+    assert len(keys) == 3
+
+
+def test_pulse_builder_colors_match_simulator(make_simulator, backend, pulses):
+    crosstalk_graph = [(0, 1), (1, 2), (0, 2)]
+    sim = make_simulator(crosstalk_graph=crosstalk_graph)
+    builder = ps.PulseBuilder(
+        BASIS, None, pulses, {}, {}, backend, crosstalk_graph=crosstalk_graph
+    )
+    assert builder._get_coloring(3) == sim._get_coloring(3)
+    assert builder._get_coloring(3) != ps.PulseBuilder(
+        BASIS, None, pulses, {}, {}, backend
+    )._get_coloring(3)
@@ -0,0 +1,28 @@
+import pathlib
+
+import pytest
+
+import pulse_simulator as ps
+
+PULSE_DIRECTORY = pathlib.Path(__file__).parent.parent / "pico-pulses"
+
+
+def test_gateset_files_get_default_names(dt):
+    library = ps.load_pulse_library(
+        str(
+            PULSE_DIRECTORY
+            / "saved-pulses-2023-12-13"
+            / "a_single_qubit_gateset_R1e-6.csv"
+        ),
+        dt,
+    )
+    assert list(library) == ps.pulse_library.ONE_QUBIT_PULSE_NAMES
+
+
+def test_other_files_need_names(dt):
+    directory = str(PULSE_DIRECTORY / "saved-pulses-2023-12-17")
+    with pytest.raises(ValueError):
+        ps.load_pulse_directory(directory, dt)
+    libraries = ps.load_pulse_directory(directory, dt, names=["rzx"])
+    assert set(libraries) == {"a_two_qubit_default", "a_two_qubit_robust"}
+    assert all(list(library) == ["rzx"] for library in libraries.values())
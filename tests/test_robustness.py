@@ -0,0 +1,30 @@
+import numpy as np
+import qiskit
+from qiskit.quantum_info import Operator
+
+import pulse_simulator as ps
+
+
+def _sx_moment(pulses):
+    name = next(name for name in pulses if name.startswith("sx"))
+    qc = qiskit.QuantumCircuit(3)
+    qc.sx(0)
+    return {0: name}, Operator(qc)
+
+
+def test_zero_offset_matches_pulse_fidelity(make_simulator, backend, config_vars, dt):
+    sim = make_simulator()
+    gates, target = _sx_moment(sim._pulses)
+    expected, _ = sim.pulse_fidelity_grad(gates, target)
+    fidelities = ps.robustness_sweep(
+        {0: sim._pulses[gates[0]].samples},
+        target,
+        [0, 1, 2],
+        ps.backend_edges(backend),
+        config_vars,
+        {"wq0": [0.0, 1e-3]},
+        dt,
+    )
+    assert np.isclose(fidelities[0], expected, rtol=0, atol=1e-8)
+    # a frequency offset detunes the qubit
+    assert fidelities[1] < fidelities[0] - 1e-4
@@ -0,0 +1,276 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import qiskit
+import scipy.linalg
+from qiskit.quantum_info import DensityMatrix
+
+import pulse_simulator as ps
+
+
+class _EvictingCache(OrderedDict):
+    # stands in for another job that evicts an entry right after a lookup
+    def move_to_end(self, key, last=True):
+        super().move_to_end(key, last)
+        self.pop(key)
+
+
+def test_propagator_evicted_after_lookup(make_simulator):
+    sim = make_simulator()
+    qc = qiskit.QuantumCircuit(3)
+    qc.sx(0)
+    expected = sim.simulate_circuit(qc)
+    sim._propagator_cache = _EvictingCache(sim._propagator_cache)
+    assert np.allclose(sim.simulate_circuit(qc).data, expected.data)
+
+
+def test_simulate_async_with_small_cache(make_simulator):
+    sim = make_simulator(cache_size=1)
+    circuits = []
+    for qubit in range(3):
+        qc = qiskit.QuantumCircuit(3)
+        qc.sx(qubit)
+        circuits.append(qc)
+    expected = [sim.simulate_circuit(qc) for qc in circuits]
+
+    async def run():
+        jobs = [sim.simulate_async(qc) for qc in circuits for _ in range(2)]
+        return await asyncio.gather(*jobs)
+
+    results = asyncio.run(run())
+    for k, result in enumerate(results):
+        assert np.allclose(result.data, expected[k // 2].data)
+
+
+def test_rebuilt_circuit_with_fresh_parameter(make_simulator):
+    sim = make_simulator()
+    circuits = []
+    for _ in range(2):
+        theta = qiskit.circuit.Parameter("θ")
+        qc = qiskit.QuantumCircuit(3)
+        qc.sx(0)
+        qc.rz(theta, 0)
+        qc.sx(0)
+        circuits.append((qc, theta))
+    results = [sim.simulate_circuit(qc, parameter_binds={t: 0.4}) for qc, t in circuits]
+    assert np.allclose(results[0].data, results[1].data)
+
+
+def test_compiled_circuit_with_parameterized_rz(make_simulator):
+    sim = make_simulator()
+    theta = qiskit.circuit.Parameter("θ")
+    qc = qiskit.QuantumCircuit(3)
+    qc.sx(0)
+    qc.rz(theta, 0)
+    qc.sx(0)
+    assert sim.get_compiled_circuit(qc).parameters == qc.parameters
+
+
+def test_projected_chain_model_is_cached(make_simulator):
+    sim = make_simulator()
+    zz_strengths, drives = sim._get_chain_model()
+    assert sim._get_chain_model()[0] is zz_strengths
+    static_diagonal, _ = sim._get_local_model()
+    sim.set_local_model(2 * static_diagonal, drives)
+    doubled, _ = sim._get_chain_model()
+    for edge, strength in zz_strengths.items():
+        assert np.isclose(doubled[edge], 2 * strength)
+
+
+def _trotter_circuit(dt):
+    step = qiskit.QuantumCircuit(2, name="trotter_step")
+    step.rzz(dt, 0, 1)
+    step.rx(dt, 0)
+    qc = qiskit.QuantumCircuit(3)
+    qc.append(step.to_gate(), [0, 1])
+    return qc
+
+
+def test_custom_gates_of_same_name_do_not_share_moments(make_simulator):
+    sim = make_simulator()
+    sim.simulate_circuit(_trotter_circuit(0.05))
+    expected = make_simulator().simulate_circuit(_trotter_circuit(0.5))
+    assert np.allclose(sim.simulate_circuit(_trotter_circuit(0.5)).data, expected.data)
+
+    async def run():
+        jobs = [sim.simulate_async(_trotter_circuit(dt)) for dt in [0.05, 0.5]]
+        return await asyncio.gather(*jobs)
+
+    first, second = asyncio.run(run())
+    assert np.allclose(second.data, expected.data)
+    assert not np.allclose(first.data, second.data)
+
+
+def _decay_variables(config_vars, scale=1.0):
+    return {k: v * scale for k, v in config_vars.items() if k[:2] in ("t1", "t2")}
+
+
+def _lindblad_moment(sim, gates, decay, num_qubits):
+    # exact Lindblad evolution of the moment from |0...0>, in the solver
+    # ordering; the pulses are constant over each sample
+    dim = 2**num_qubits
+    model = sim._solver.model
+    static = np.asarray(model.static_operator)
+    operators = np.asarray(model.operators)
+    channels = sim._solver._hamiltonian_channels
+    identity = np.eye(dim)
+    dissipator = np.zeros((dim**2, dim**2), dtype=complex)
+    for qubit in range(num_qubits):
+        for jump in ps.qubit_decay_model(qubit, list(range(num_qubits)), decay):
+            jump = np.asarray(jump)
+            decay_rate = jump.conj().T @ jump
+            dissipator += np.kron(jump, jump.conj())
+            dissipator -= 0.5 * np.kron(decay_rate, identity)
+            dissipator -= 0.5 * np.kron(identity, decay_rate.T)
+
+    def step(hamiltonian, duration):
+        commutator = np.kron(hamiltonian, identity) - np.kron(identity, hamiltonian.T)
+        return scipy.linalg.expm((-1j * commutator + dissipator) * duration)
+
+    window = sim._moment_duration(gates)
+    rho = np.zeros(dim**2, dtype=complex)
+    rho[0] = 1.0
+    for k in range(window):
+        hamiltonian = static.copy()
+        for qubit, name in gates.items():
+            samples = sim._pulses[name].samples
+            if k < len(samples):
+                channel = channels.index(qiskit.pulse.DriveChannel(qubit).name)
+                hamiltonian = hamiltonian + samples[k].real * operators[channel]
+        rho = step(hamiltonian, sim._dt) @ rho
+    rho = step(static, window * (1 - sim._dt)) @ rho
+    order = ps.qubit_reversal_permutation(num_qubits)
+    return rho.reshape(dim, dim)[np.ix_(order, order)]
+
+
+def test_density_matrix_matches_lindblad(make_simulator, config_vars):
+    sim = make_simulator(2)
+    decay = _decay_variables(config_vars)
+    sim.set_decay_model(decay)
+    qc = qiskit.QuantumCircuit(2)
+    qc.sx(0)
+    qc.x(1)
+    ((gates, _, _),) = sim._compile(qc, None)
+    expected = _lindblad_moment(sim, gates, decay, 2)
+    ideal = DensityMatrix(sim.simulate_circuit(qc).data[:, 0]).data
+    error = np.max(np.abs(sim.simulate_density_matrix(qc).data - expected))
+    assert error < 0.1 * np.max(np.abs(ideal - expected))
+
+
+def test_trajectories_match_density_matrix(make_simulator, config_vars):
+    sim = make_simulator(2)
+    # strong decay, so that the decay is well above the sampling error
+    sim.set_decay_model(_decay_variables(config_vars, scale=0.01))
+    qc = qiskit.QuantumCircuit(2)
+    qc.sx(0)
+    qc.x(1)
+    qc.sx(1)
+    rho = sim.simulate_density_matrix(qc)
+    observables = [{0: "Z"}, {1: "Z"}, {0: "Y"}]
+    results = sim.simulate_trajectories(qc, observables, 2000, seed=7)
+    for (mean, stderr), label in zip(results, ["IZ", "ZI", "IY"]):
+        expected = rho.expectation_value(qiskit.quantum_info.Pauli(label)).real
+        assert abs(mean - expected) < 4 * stderr + 1e-3
+
+
+def test_find_repeated_blocks(make_simulator):
+    sim = make_simulator()
+    a = ({0: "sx_a"}, {}, 1)
+    b = ({(0, 1): "cx_a"}, {}, 2)
+    c = ({0: "sx_a"}, {0: 0.5}, 1)
+    moments = [c] + [a, b] * 3 + [c, c]
+    assert sim._find_repeated_blocks(moments) == [([c], 1), ([a, b], 3), ([c], 2)]
+
+
+def test_repetitions_match_explicit_copies(make_simulator):
+    sim = make_simulator(2)
+    # every moment uses all wires, so the copies schedule as the block does
+    block = qiskit.QuantumCircuit(2)
+    block.sx(0)
+    block.x(1)
+    block.rz(0.3, 1)
+    block.cx(0, 1)
+    copies = qiskit.QuantumCircuit(2)
+    for _ in range(3):
+        copies.compose(block, inplace=True)
+    expected = make_simulator(2).simulate_circuit(copies)
+    repeated = sim.simulate_circuit(block, repetitions=3)
+    assert np.allclose(repeated.data, expected.data)
+
+
+def test_simulate_async_does_not_share_jobs_across_settings(make_simulator):
+    sim = make_simulator()
+    qc = qiskit.QuantumCircuit(3)
+    qc.sx(0)
+    executor = ThreadPoolExecutor(1)
+    gate = threading.Event()
+    executor.submit(gate.wait)
+
+    async def run():
+        first = asyncio.ensure_future(sim.simulate_async(qc, executor=executor))
+        await asyncio.sleep(0)
+        sim.set_precision("single")
+        second = asyncio.ensure_future(sim.simulate_async(qc, executor=executor))
+        await asyncio.sleep(0)
+        sim.set_integration("split2")
+        third = asyncio.ensure_future(sim.simulate_async(qc, executor=executor))
+        await asyncio.sleep(0)
+        num_jobs = len(sim._in_flight)
+        gate.set()
+        await asyncio.gather(first, second, third)
+        return num_jobs
+
+    assert asyncio.run(run()) == 3
+    executor.shutdown()
+
+
+def _mixed_circuit():
+    qc = qiskit.QuantumCircuit(3)
+    qc.sx(0)
+    qc.x(1)
+    qc.rz(0.4, 0)
+    qc.cx(0, 1)
+    qc.sx(2)
+    qc.sx(1)
+    return qc
+
+
+def test_single_solve_matches_moments(make_simulator):
+    sim = make_simulator()
+    expected = sim.simulate_circuit(_mixed_circuit())
+    single = sim.simulate_circuit(_mixed_circuit(), single_solve=True)
+    assert np.allclose(single.data, expected.data, atol=1e-10)
+
+
+def test_single_precision_matches_double(make_simulator):
+    expected = make_simulator().simulate_circuit(_mixed_circuit())
+    single = make_simulator(precision="single").simulate_circuit(_mixed_circuit())
+    assert np.allclose(single.data, expected.data, atol=1e-5)
+
+
+def test_split_operator_matches_exact(make_simulator):
+    expected = make_simulator().simulate_circuit(_mixed_circuit())
+    for integration, atol in [("split2", 1e-5), ("split4", 1e-7)]:
+        split = make_simulator(integration=integration)
+        assert np.allclose(
+            split.simulate_circuit(_mixed_circuit()).data, expected.data, atol=atol
+        )
+
+
+def test_propagator_table_matches_exact(make_simulator):
+    expected = make_simulator().simulate_circuit(_mixed_circuit())
+    table = make_simulator(integration="table").simulate_circuit(_mixed_circuit())
+    assert np.allclose(table.data, expected.data, atol=1e-5)
+
+
+def test_two_level_leakage_matches_split2(make_simulator):
+    sim = make_simulator(integration="split2")
+    static_diagonal, drives = sim._get_local_model()
+    sim.set_transmon_model(static_diagonal, drives, levels=2)
+    state, leakage = sim.simulate_leakage(_mixed_circuit(), order=2, substeps=1)
+    expected = sim.simulate_circuit(_mixed_circuit()).reverse_qargs().data[:, 0]
+    assert np.allclose(state, expected, atol=1e-10)
+    assert np.allclose(leakage, 0.0)
@@ -0,0 +1,14 @@
+import numpy as np
+
+import pulse_simulator as ps
+
+
+def test_zz_diagonal_matches_zz_operators():
+    registers = [2, 0, 1]
+    edges = [(0, 1), (1, 2), (0, 2)]
+    values = np.array([[0.1, -0.2, 0.3], [1.0, 2.0, 3.0]])
+    expected = np.zeros((2, 2 ** len(registers)))
+    for k, edge in enumerate(edges):
+        zz = ps.from_label(ps.to_label({i: "Z" for i in edge}, registers))
+        expected += values[:, k : k + 1] * np.real(np.diag(zz.data))
+    assert np.allclose(ps.zz_diagonal(values, edges, registers), expected)